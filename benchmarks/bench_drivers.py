@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark of driver methods against a local fixture server.
+
+Every driver talks to benchmarks/fixture_server.py (http for Socomec, https
+for Riello when the openssl command is available) which serves the pages in
+forms/ with added latency and limited bandwidth. For every driver method it
+reports the number of requests, bytes transferred (both directions), time
+spent parsing HTML (fastest of --repeat runs) and end-to-end latency
+(median).
+
+Run from the repository root:
+
+    python benchmarks/bench_drivers.py [--latency 0.02] [--bandwidth 0] [--repeat 5]
+    python benchmarks/bench_drivers.py --save benchmarks/baseline_drivers.json
+    python benchmarks/bench_drivers.py --compare benchmarks/baseline_drivers.json
+
+With --compare the exit status is 1 if any method makes more requests than
+in the baseline, or its bytes, parse time or latency grew by more than
+--tolerance.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import FixtureServer, openssl_available  # noqa: E402
+from upsconfer import UpsSocomecNetys, UpsSocomecMasterys, UpsRielloSentinel  # noqa: E402
+
+
+def timed_parse(driver):
+    """
+    Subclass of driver that adds time spent parsing HTML to `parse_time`.
+    """
+
+    def _parse(self, text, *args):
+        start = time.time()
+        try:
+            return driver._parse(self, text, *args)
+        finally:
+            self.parse_time += time.time() - start
+
+    return type(driver.__name__, (driver,), {'parse_time': 0.0, '_parse': _parse})
+
+
+def changed(config, entry):
+    """
+    Copy of config with community of one entry changed, so setters have something to write.
+    """
+    config = dict((k, dict(v)) for k, v in config.items())
+    config[entry]['community'] = 'bench'
+    return config
+
+
+def consume(iterable):
+    return list(iterable)
+
+
+# method -> (prepare, run): prepare(setup) makes the argument for run(ups, argument) with another,
+# logged in ups before measuring starts (None for methods without one)
+METHODS = [
+    ('login', (None, lambda ups, arg: ups.login())),
+    ('get_info', (None, lambda ups, arg: ups.get_info())),
+    ('get_snmp_config', (None, lambda ups, arg: ups.get_snmp_config())),
+    ('set_snmp_config', (lambda setup: changed(setup.get_snmp_config(), 'default'),
+                         lambda ups, config: ups.set_snmp_config(config))),
+    ('get_trap_config', (None, lambda ups, arg: ups.get_trap_config())),
+    ('set_trap_config', (lambda setup: changed(setup.get_trap_config(), '1'),
+                         lambda ups, config: ups.set_trap_config(config))),
+    ('get_status', (None, lambda ups, arg: ups.get_status())),
+    ('iter_events', (None, lambda ups, arg: consume(ups.iter_events()))),
+    ('get_all', (None, lambda ups, arg: ups.get_all())),
+    ('logout', (None, lambda ups, arg: ups.logout())),
+]
+
+DRIVERS = [
+    (UpsSocomecNetys, ['login', 'get_info', 'get_snmp_config', 'set_snmp_config', 'get_trap_config',
+                       'set_trap_config', 'get_status', 'iter_events', 'get_all', 'logout']),
+    # the captured trap page of masterys is read only (no form fields)
+    (UpsSocomecMasterys, ['login', 'get_info', 'get_snmp_config', 'set_snmp_config', 'logout']),
+    (UpsRielloSentinel, ['login', 'get_info', 'get_snmp_config', 'set_snmp_config', 'get_trap_config',
+                         'set_trap_config', 'get_all', 'logout']),
+]
+
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2.0
+
+
+def measure(driver, server, name, method, repeat):
+    prepare, func = method
+    runs = []
+    for i in range(repeat):
+        setup = arg = None
+        if prepare is not None:
+            setup = driver(server.address, 'admin', 'pass')
+            setup.login()
+            arg = prepare(setup)
+        ups = driver(server.address, 'admin', 'pass')
+        if name != 'login':
+            ups.login()
+        ups.parse_time = 0.0
+        server.reset()
+        start = time.time()
+        func(ups, arg)
+        elapsed = time.time() - start
+        counters = server.reset()
+        runs.append({
+            'requests': counters['requests'],
+            'bytes': counters['in'] + counters['out'],
+            'parse': ups.parse_time,
+            'latency': elapsed,
+        })
+        if name != 'logout':
+            ups.logout()
+        if setup is not None:
+            setup.logout()
+    return {
+        'requests': max(r['requests'] for r in runs),
+        'bytes': max(r['bytes'] for r in runs),
+        'parse': min(r['parse'] for r in runs),
+        'latency': median([r['latency'] for r in runs]),
+    }
+
+
+def run(args):
+    tls = openssl_available() and not args.no_tls
+    servers = {
+        'http': FixtureServer(args.latency, args.bandwidth).start(),
+        'https': FixtureServer(args.latency, args.bandwidth, tls=tls).start(),
+    }
+    methods = dict(METHODS)
+    results = {}
+    try:
+        for driver, names in DRIVERS:
+            driver = timed_parse(driver)
+            if driver.base_url.startswith('https') and not tls:
+                driver.base_url = 'http://%s'
+            server = servers['https' if driver.base_url.startswith('https') else 'http']
+            for name in names:
+                results['%s.%s' % (driver.__name__, name)] = measure(driver, server, name, methods[name], args.repeat)
+    finally:
+        for server in servers.values():
+            server.stop()
+    return {
+        'settings': {'latency': args.latency, 'bandwidth': args.bandwidth, 'repeat': args.repeat, 'tls': tls,
+                     'python': platform.python_version()},
+        'results': results,
+    }
+
+
+def report(data, baseline=None):
+    print('%-36s %8s %9s %10s %12s' % ('method', 'requests', 'bytes', 'parse [ms]', 'latency [ms]'))
+    for key in sorted(data['results']):
+        r = data['results'][key]
+        line = '%-36s %8d %9d %10.2f %12.1f' % (key, r['requests'], r['bytes'], r['parse'] * 1e3, r['latency'] * 1e3)
+        if baseline and key in baseline['results']:
+            b = baseline['results'][key]
+            line += '   (%+d req, %+d B, %+.1f ms)' % (
+                r['requests'] - b['requests'], r['bytes'] - b['bytes'], (r['latency'] - b['latency']) * 1e3)
+        print(line)
+
+
+# differences of times below these many seconds are noise
+NOISE = {'parse': 0.002, 'latency': 0.005}
+
+
+def regressions(data, baseline, tolerance):
+    found = []
+    for key, b in sorted(baseline['results'].items()):
+        r = data['results'].get(key)
+        if r is None:
+            continue
+        if r['requests'] > b['requests']:
+            found.append('%s: %d requests, was %d' % (key, r['requests'], b['requests']))
+        for metric in ('bytes', 'parse', 'latency'):
+            if r[metric] > max(b[metric], NOISE.get(metric, 0)) * (1 + tolerance):
+                found.append('%s: %s %s, was %s' % (key, metric, r[metric], b[metric]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every request')
+    parser.add_argument('--bandwidth', type=int, default=0, help='bytes per second per connection, 0 for no limit')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of every method')
+    parser.add_argument('--no-tls', action='store_true', help='use plain http for Riello too')
+    parser.add_argument('--save', metavar='FILE', help='write results to a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare results with a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative growth of bytes, parse time and latency')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for k in ('latency', 'bandwidth'):
+            setattr(args, k, baseline['settings'][k])
+        if baseline['settings'].get('python') != platform.python_version():
+            print('Baseline was made with Python %s, parse times may differ' % baseline['settings'].get('python'))
+
+    data = run(args)
+    report(data, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if baseline:
+        found = regressions(data, baseline, args.tolerance)
+        for line in found:
+            print('REGRESSION %s' % line)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of reading form fields from captured pages in forms/.
+
+Compares the per-field XPath queries drivers used before (one full document
+walk per field) with the single pass FormExtractor.
+
+Run from the repository root:
+
+    python benchmarks/bench_form.py [-n 200]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+import lxml.html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from upsconfer.form import FormExtractor  # noqa: E402
+
+
+def read_page(*parts):
+    with open(os.path.join(ROOT, 'forms', *parts), 'rb') as f:
+        return f.read()
+
+
+def netys_trap_xpath(html):
+    xp_ip = '//input[@name="NMS{nr}"]/@value'
+    xp_community = '//input[@name="COM{nr}"]/@value'
+    xp_severity = '//select[@name="PER{nr}"]/option[@selected]/@value'
+    xp_ver = '//select[@name="TTT{nr}"]/option[@selected]/@value'
+    xp_type = '//select[@name="TYP{nr}"]/option[@selected]/@value'
+    values = []
+    for i in range(1, 9):
+        for xp in (xp_ip, xp_community, xp_severity, xp_ver, xp_type):
+            values.append(html.xpath(xp.format(nr=i))[0])
+    return values
+
+
+def netys_trap_form(html):
+    form = FormExtractor.extract(html)
+    values = []
+    for i in range(1, 9):
+        for name in ('NMS%d', 'COM%d', 'PER%d', 'TTT%d', 'TYP%d'):
+            values.append(form[name % i])
+    return values
+
+
+def netys_snmp_xpath(html):
+    xp_ip = '//input[@name="NM{nr}"]/@value'
+    xp_community = '//input[@name="CO{nr}"]/@value'
+    xp_access = '//select[@name="PE{nr}"]/option[@selected]/@value'
+    values = [html.xpath(xp_community.format(nr=1))[0], html.xpath(xp_access.format(nr=1))[0]]
+    for i in range(2, 9):
+        for xp in (xp_ip, xp_community, xp_access):
+            values.append(html.xpath(xp.format(nr=i))[0])
+    return values
+
+
+def netys_snmp_form(html):
+    form = FormExtractor.extract(html)
+    values = [form['CO1'], form['PE1']]
+    for i in range(2, 9):
+        for name in ('NM%d', 'CO%d', 'PE%d'):
+            values.append(form[name % i])
+    return values
+
+
+def masterys_snmp_xpath(html):
+    values = []
+    for c in 'BCDEFGHI':
+        values.append(html.xpath('//input[@name="XAAAAAAA{nr}AADE"]/@value'.format(nr=c)))
+        values.append(html.xpath('//input[@name="XAAAAAAA{nr}AADF"]/@value'.format(nr=c))[0])
+        values.append(html.xpath('//select[@name="XAAAAAAA{nr}AADG"]/option[@selected]/@value'.format(nr=c))[0])
+    return values
+
+
+def masterys_snmp_form(html):
+    form = FormExtractor.extract(html)
+    values = []
+    for c in 'BCDEFGHI':
+        for name in ('XAAAAAAA%sAADE', 'XAAAAAAA%sAADF', 'XAAAAAAA%sAADG'):
+            values.append(form.get(name % c))
+    return values
+
+
+RIELLO_FIELDS = ['snmp_cconfig0', 'snmp_cconfig1', 'snmp_cconfig2', 'snmp_sysC', 'snmp_sysN', 'snmp_sysL', 'session'] + \
+    ['snmp_config%d' % i for i in range(0, 7)]
+
+
+def riello_snmp_xpath(html):
+    return [html.xpath('//input[@name="%s"]/@value' % k) for k in RIELLO_FIELDS]
+
+
+def riello_snmp_form(html):
+    form = FormExtractor.extract(html)
+    return [form.get(k) for k in RIELLO_FIELDS]
+
+
+CASES = [
+    ('netys trap', ('socomec', 'netys', 'net_snmptrap.htm'), netys_trap_xpath, netys_trap_form),
+    ('netys snmp', ('socomec', 'netys', 'net_snmpaccess1.htm'), netys_snmp_xpath, netys_snmp_form),
+    ('masterys snmp', ('socomec', 'masterys', 'PageAdmAgentAccess.html'), masterys_snmp_xpath, masterys_snmp_form),
+    ('riello snmp', ('riello', 'sentinel', 'snmp_config.html'), riello_snmp_xpath, riello_snmp_form),
+]
+
+
+def best(func, arg, number, repeat=5):
+    return min(timeit.repeat(lambda: func(arg), number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=200, help='iterations per measurement')
+    args = parser.parse_args()
+
+    print('%-15s %12s %12s %12s %8s' % ('page', 'parse [us]', 'xpath [us]', 'form [us]', 'speedup'))
+    for name, page, old, new in CASES:
+        text = read_page(*page)
+        parse = best(lxml.html.document_fromstring, text, args.number)
+        html = lxml.html.document_fromstring(text)
+        t_old = best(old, html, args.number)
+        t_new = best(new, html, args.number)
+        print('%-15s %12.1f %12.1f %12.1f %7.1fx' % (name, parse * 1e6, t_old * 1e6, t_new * 1e6, t_old / t_new))
+
+
+if __name__ == '__main__':
+    main()
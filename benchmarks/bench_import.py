@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of startup cost: time to run a new interpreter that imports parts
+of upsconfer, and time and number of modules of the import itself.
+
+`import upsconfer` only loads drivers when they are first used (see
+upsconfer.registry). `all drivers` imports every driver module, which is what
+`import upsconfer` used to do (and still does on Python before 3.7).
+
+Run from the repository root:
+
+    python benchmarks/bench_import.py [-n 20]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_clock = getattr(time, 'perf_counter', time.time)
+
+SCENARIOS = [
+    ('python', 'pass'),
+    ('import upsconfer', 'import upsconfer'),
+    ('one driver', 'from upsconfer import UpsSocomecNetys'),
+    ('all drivers', 'import upsconfer.socomec, upsconfer.riello'),
+    ('cli', 'import upsconfer.cli'),
+]
+
+CHILD = """
+import sys, time
+clock = getattr(time, 'perf_counter', time.time)
+before = set(sys.modules)
+start = clock()
+%s
+elapsed = clock() - start
+print('%%f %%d %%d' %% (elapsed, len(set(sys.modules) - before), 'requests' in sys.modules or 'lxml' in sys.modules))
+"""
+
+
+def run_child(statement):
+    """
+    :return: (wall seconds of the whole interpreter, seconds of the import, new modules, heavy deps loaded)
+    """
+    start = _clock()
+    output = subprocess.check_output([sys.executable, '-c', CHILD % statement], cwd=ROOT)
+    wall = _clock() - start
+    elapsed, modules, heavy = output.split()
+    return wall, float(elapsed), int(modules), bool(int(heavy))
+
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=20, help='interpreters started per scenario')
+    args = parser.parse_args()
+
+    print('Python %s' % sys.version.split()[0])
+    print('%-18s %12s %12s %8s %16s' % ('scenario', 'process [ms]', 'import [ms]', 'modules', 'requests/lxml'))
+    for name, statement in SCENARIOS:
+        runs = [run_child(statement) for i in range(args.number)]
+        print('%-18s %12.1f %12.1f %8d %16s' % (
+            name, median([r[0] for r in runs]) * 1e3, median([r[1] for r in runs]) * 1e3,
+            runs[-1][2], 'yes' if runs[-1][3] else 'no'))
+
+
+if __name__ == '__main__':
+    main()
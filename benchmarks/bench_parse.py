@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of HTML parsing of pages in forms/: whole pages with a new parser
+per call against driver parsing (per-thread reused parser, only FRAGMENTS
+of the page).
+
+Reports time per parse, number of elements in the tree and memory per
+parsed page. Trees are built by libxml2 outside of Python's allocator, so
+memory is measured as growth of the resident set size (Linux only) while
+--keep trees are kept alive, in a new interpreter for every measurement.
+
+Run from the repository root:
+
+    python benchmarks/bench_parse.py [-n 200] [--keep 500]
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import io
+import os
+import subprocess
+import sys
+import timeit
+
+import lxml.html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from upsconfer import UpsSocomecNetys, UpsSocomecMasterys, UpsRielloSentinel  # noqa: E402
+
+CASES = [
+    (UpsSocomecNetys, '/info_ident.htm', 'socomec/netys/info_ident.htm'),
+    (UpsSocomecNetys, '/info_status.htm', 'socomec/netys/info_status.htm'),
+    (UpsSocomecNetys, '/net_snmpaccess1.htm', 'socomec/netys/net_snmpaccess1.htm'),
+    (UpsSocomecNetys, '/net_snmptrap.htm', 'socomec/netys/net_snmptrap.htm'),
+    (UpsSocomecNetys, '/hist_log1.htm', 'socomec/netys/hist_log1.htm'),
+    (UpsSocomecMasterys, '/PageAdmAgentAccess.html', 'socomec/masterys/PageAdmAgentAccess.html'),
+    (UpsRielloSentinel, '/cgi-bin/view_about.cgi', 'riello/sentinel/view_about.html'),
+    (UpsRielloSentinel, '/cgi-bin/snmp_config.cgi', 'riello/sentinel/snmp_config.html'),
+]
+
+
+def read_page(page):
+    with io.open(os.path.join(ROOT, 'forms', page), encoding='iso-8859-1') as f:
+        return f.read()
+
+
+def whole_page(text):
+    return lxml.html.document_fromstring(text, parser=lxml.html.HTMLParser())
+
+
+def rss():
+    """
+    :return: resident set size in bytes or None if not known
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def parsers(case):
+    driver, path, page = CASES[case]
+    ups = driver('localhost', 'admin', 'pass')
+    text = read_page(page)
+    return ups, text, {
+        'old': lambda: whole_page(text),
+        'new': lambda: ups._parse(text, path),
+    }
+
+
+def memory_per_tree(case, variant, keep):
+    """
+    Runs measure_memory() in a new interpreter, so memory freed by earlier
+    measurements can not be reused.
+    """
+    if rss() is None:
+        return None
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+                                      '--measure-memory', str(case), variant, str(keep)])
+    return float(output)
+
+
+def measure_memory(case, variant, keep):
+    ups, text, parse = parsers(case)
+    parse = parse[variant]
+    parse()
+    gc.collect()
+    before = rss()
+    trees = [parse() for i in range(keep)]
+    after = rss()
+    print(float(after - before) / len(trees))
+
+
+def best(func, number, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=200, help='iterations per measurement')
+    parser.add_argument('--keep', type=int, default=500, help='trees kept alive to measure memory')
+    parser.add_argument('--measure-memory', nargs=3, metavar=('CASE', 'VARIANT', 'KEEP'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure_memory:
+        case, variant, keep = args.measure_memory
+        return measure_memory(int(case), variant, int(keep))
+
+    print('%-44s %7s %7s %9s %9s %7s %7s %9s %9s' % (
+        'page', 'bytes', 'parsed', 'old [us]', 'new [us]', 'old el', 'new el', 'old [kB]', 'new [kB]'))
+    for case, (driver, path, page) in enumerate(CASES):
+        ups, text, parse = parsers(case)
+        t_old = best(parse['old'], args.number)
+        t_new = best(parse['new'], args.number)
+        el_old = sum(1 for e in parse['old']().iter())
+        el_new = sum(1 for e in parse['new']().iter())
+        m_old = memory_per_tree(case, 'old', args.keep)
+        m_new = memory_per_tree(case, 'new', args.keep)
+        memory = '%9s %9s' % ('-', '-')
+        if m_old is not None:
+            memory = '%9.1f %9.1f' % (m_old / 1024, m_new / 1024)
+        print('%-44s %7d %7d %9.1f %9.1f %7d %7d %s' % (
+            '%s %s' % (driver.__name__, path), len(text), len(ups._fragment(path, text)),
+            t_old * 1e6, t_new * 1e6, el_old, el_new, memory))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark of keeping info, SNMP and trap config of a synthetic fleet
+in memory: dicts of strings as drivers return them against the records of
+upsconfer.records (typed=True).
+
+Configs of every device are decoded from the pages in forms/ with the
+driver's form specs (devices of the three drivers in turn) and then varied
+per device: own serial and MAC address, trap receiver 1 and SNMP client 1
+at one of --networks addresses, one of a few communities. Every string is a
+new object, like strings read from a parsed page.
+
+Memory is measured as growth of the resident set size (Linux only) in a new
+interpreter for every variant; with tracemalloc (Python 3) also as bytes
+allocated by Python, in another interpreter (tracing needs memory too).
+
+Run from the repository root:
+
+    python benchmarks/bench_records.py [--devices 10000] [--networks 50]
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import time
+
+import lxml.html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from upsconfer import UpsSocomecNetys, UpsSocomecMasterys, UpsRielloSentinel  # noqa: E402
+from upsconfer import records  # noqa: E402
+from upsconfer.form import FormExtractor  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+INFO = {
+    'netys': {'manufacturer': 'Socomec', 'agent_type': 'NetVision', 'model': 'NETYS RT 1/1 UPS',
+              'firmware': '1.4', 'agent_firmware': '2.0h ', 'rating_va': '2200'},
+    'masterys': {'manufacturer': 'Socomec', 'agent_type': 'NetVision', 'model': 'MASTERYS 3/3 SYSTEM 160 kVA',
+                 'firmware': '?Revision', 'agent_firmware': '6.20'},
+    'riello': {'manufacturer': 'Riello', 'agent_type': 'Netman 204', 'model': 'UMO3', 'firmware': 'SWM035-01-09',
+               'agent_firmware': '01.04', 'rating_va': '2200', 'rating_w': '1900', 'battery_capacity_ah': '7'},
+}
+
+# name -> (snmp page, snmp spec, trap page, trap spec); the captured masterys trap page is read only
+DEVICES = [
+    ('netys', 'socomec/netys/net_snmpaccess1.htm', UpsSocomecNetys.SNMP_FORM,
+     'socomec/netys/net_snmptrap.htm', UpsSocomecNetys.TRAP_FORM),
+    ('masterys', 'socomec/masterys/PageAdmAgentAccess.html', UpsSocomecMasterys.SNMP_FORM, None, None),
+    ('riello', 'riello/sentinel/snmp_config.html', UpsRielloSentinel.SNMP_FORM,
+     'riello/sentinel/snmp_config.html', UpsRielloSentinel.TRAP_FORM),
+]
+
+COMMUNITIES = ['public', 'commstr', 'nms-ro', 'monitoring']
+
+
+def read_form(page):
+    with open(os.path.join(ROOT, 'forms', page), 'rb') as f:
+        return FormExtractor.extract(lxml.html.document_fromstring(f.read()))
+
+
+def fresh(value):
+    """
+    Equal string that is a new object (strings of up to one character are shared by Python anyway).
+    """
+    if isinstance(value, dict):
+        return dict((fresh(k), fresh(v)) for k, v in value.items())
+    if isinstance(value, str) and len(value) > 1:
+        return (value + ' ')[:-1]
+    return value
+
+
+def templates():
+    result = []
+    for name, snmp_page, snmp_spec, trap_page, trap_spec in DEVICES:
+        snmp = snmp_spec.decode(read_form(snmp_page))
+        trap = trap_spec.decode(read_form(trap_page)) if trap_page else {}
+        result.append((name, snmp, trap))
+    return result
+
+
+def fleet(devices, networks):
+    """
+    :return: generator of (host, {'info': ..., 'snmp': ..., 'trap': ...}) of synthetic devices
+    """
+    kinds = templates()
+    for i in range(devices):
+        name, snmp, trap = kinds[i % len(kinds)]
+        nms = '10.%d.0.10' % (i % networks)
+        community = COMMUNITIES[i % len(COMMUNITIES)]
+        info = dict(INFO[name], serial='SN%08d' % i, mac_address='00:02:63:%02x:%02x:%02x' % (
+            i >> 16 & 255, i >> 8 & 255, i & 255))
+        snmp = fresh(snmp)
+        if '1' in snmp:
+            snmp['1'].update(ip=nms, community=community)
+        trap = fresh(trap)
+        if '1' in trap:
+            trap['1'].update(ip=nms, community=community)
+        yield 'ups%d.example.com' % i, {'info': fresh(info), 'snmp': snmp, 'trap': trap}
+
+
+def typed(device):
+    return {
+        'info': records.device_info(device['info']),
+        'snmp': records.snmp_config(device['snmp']),
+        'trap': records.trap_config(device['trap']),
+    }
+
+
+def rss():
+    """
+    :return: resident set size in bytes or None if not known
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def measure(variant, devices, networks, trace):
+    """
+    Keeps snapshots of the whole fleet, prints RSS growth, traced bytes (-1
+    when not traced) and seconds it took.
+    """
+    list(fleet(1, networks))
+    gc.collect()
+    trace = trace and tracemalloc is not None
+    if trace:
+        tracemalloc.start()
+    before = rss()
+    start = time.time()
+    if variant == 'typed':
+        snapshots = dict((host, typed(device)) for host, device in fleet(devices, networks))
+    else:
+        snapshots = dict(fleet(devices, networks))
+    elapsed = time.time() - start
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] if trace else -1
+    print(rss() - before, traced, elapsed, len(snapshots))
+
+
+def run(variant, devices, networks, trace=False):
+    """
+    Runs measure() in a new interpreter, so memory freed by earlier measurements can not be reused.
+    """
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--measure',
+                                      variant, str(devices), str(networks), str(int(trace))])
+    grown, traced, elapsed, count = output.split()
+    return int(grown), int(traced), float(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--devices', type=int, default=10000, help='devices in the synthetic fleet')
+    parser.add_argument('--networks', type=int, default=50, help='distinct trap receiver addresses')
+    parser.add_argument('--measure', nargs=4, metavar=('VARIANT', 'DEVICES', 'NETWORKS', 'TRACE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        variant, devices, networks, trace = args.measure
+        return measure(variant, int(devices), int(networks), trace == '1')
+    if rss() is None:
+        sys.exit('Resident set size is only known on Linux')
+
+    # conversion and to_dict() speed, one device of each kind
+    sample = [device for host, device in fleet(3, args.networks)]
+    converted = [typed(device) for device in sample]
+    number = 2000
+    start = time.time()
+    for i in range(number):
+        for device in sample:
+            typed(device)
+    convert = (time.time() - start) / number / len(sample)
+    start = time.time()
+    for i in range(number):
+        for device in converted:
+            records.to_plain(device)
+    to_dict = (time.time() - start) / number / len(sample)
+
+    print('%d devices, %d distinct trap receivers' % (args.devices, args.networks))
+    print('%-8s %12s %12s %12s %12s' % ('variant', 'RSS [MB]', 'B/device', 'traced [MB]', 'build [s]'))
+    for variant in ('dict', 'typed'):
+        grown, traced, elapsed = run(variant, args.devices, args.networks)
+        if tracemalloc is not None:
+            traced = run(variant, args.devices, args.networks, trace=True)[1]
+        print('%-8s %12.1f %12d %12s %12.2f' % (
+            variant, grown / 1048576.0, grown // args.devices,
+            '%.1f' % (traced / 1048576.0) if traced >= 0 else '-', elapsed))
+    print('to records: %.1f us/device, to_plain(): %.1f us/device' % (convert * 1e6, to_dict * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of turning form fields into config dicts and back.
+
+Compares hand written loops drivers used before (field names formatted on
+every call, reverse value lookups with a linear search of the value map)
+with the FormSpec tables drivers use now. Input is the form of the captured
+pages in forms/, as read by FormExtractor.
+
+Run from the repository root:
+
+    python benchmarks/bench_spec.py [-n 2000]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+import lxml.html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from upsconfer import UpsSocomecNetys, UpsSocomecMasterys, UpsRielloSentinel  # noqa: E402
+from upsconfer.form import FormExtractor  # noqa: E402
+from upsconfer.util import char_range  # noqa: E402
+
+
+def read_form(*parts):
+    with open(os.path.join(ROOT, 'forms', *parts), 'rb') as f:
+        return FormExtractor.extract(lxml.html.document_fromstring(f.read()))
+
+
+def get_dict_key(d, value, default=None):
+    if value not in d.values():
+        return default
+    return list(d.keys())[list(d.values()).index(value)]
+
+
+def netys_trap_decode(form):
+    d = UpsSocomecNetys
+    config = {}
+    for i in range(1, 9):
+        config[str(i)] = {'ip': form['NMS%d' % i]}
+        config[str(i)]['community'] = form['COM%d' % i]
+        config[str(i)]['severity'] = get_dict_key(d.MAP_SEV_PER, form['PER%d' % i])
+        config[str(i)]['version'] = get_dict_key(d.MAP_VER_TTT, form['TTT%d' % i])
+        config[str(i)]['type'] = get_dict_key(d.MAP_TYPE_TYP, form['TYP%d' % i])
+    return config
+
+
+def netys_trap_encode(config):
+    d = UpsSocomecNetys
+    data = {'Submit': 'Submit'}
+    for i in range(1, 9):
+        data['NMS%d' % i] = config[str(i)]['ip']
+        data['COM%d' % i] = config[str(i)]['community']
+        data['PER%d' % i] = d.MAP_SEV_PER.get((config[str(i)]['severity']), 'non')
+        data['TTT%d' % i] = d.MAP_VER_TTT.get(config[str(i)]['version'], '1')
+        data['TYP%d' % i] = d.MAP_TYPE_TYP.get(config[str(i)]['type'], 'rfc')
+    return data
+
+
+def masterys_snmp_decode(form):
+    config = {}
+    idx = 1
+    for i in char_range('B', 'I'):
+        config[str(idx)] = {'ip': form.get('XAAAAAAA%sAADE' % i, '')}
+        config[str(idx)]['community'] = form['XAAAAAAA%sAADF' % i]
+        config[str(idx)]['access'] = get_dict_key(UpsSocomecMasterys.MAP_ACCESS, form['XAAAAAAA%sAADG' % i], 'none')
+        idx += 1
+    last_idx = str(idx - 1)
+    last_entry = config[last_idx]
+    del last_entry['ip']
+    config['default'] = last_entry
+    del config[last_idx]
+    return config
+
+
+def masterys_snmp_encode(config):
+    access = UpsSocomecMasterys.MAP_ACCESS
+    data = {}
+    idx = 1
+    for i in char_range('B', 'H'):
+        entry = config[str(idx)]
+        data['XAAAAAAA%sAADE' % i] = entry['ip']
+        data['XAAAAAAA%sAADF' % i] = entry['community']
+        data['XAAAAAAA%sAADG' % i] = access.get(entry['access'], 'none')
+        idx += 1
+    data['XAAAAAAAIAADE'] = ''
+    data['XAAAAAAAIAADF'] = config['default']['community']
+    data['XAAAAAAAIAADG'] = access.get(config['default']['access'], 'none')
+    return data
+
+
+def riello_trap_decode(form):
+    config = {}
+    for i in range(0, 7):
+        entry = {}
+        entry['ip'] = form.get('snmp_config%d' % i, '').strip()
+        entry['community'] = form.get('snmp_cconfig2', '').strip()
+        config[str(i + 1)] = entry
+    return config
+
+
+def riello_trap_encode(config):
+    data = {'snmp_cconfig2': config['1']['community']}
+    for i in range(0, 7):
+        if str(i + 1) not in config:
+            continue
+        data['snmp_config%d' % i] = config[str(i + 1)]['ip']
+    return data
+
+
+CASES = [
+    ('netys trap', ('socomec', 'netys', 'net_snmptrap.htm'), UpsSocomecNetys.TRAP_FORM,
+     netys_trap_decode, netys_trap_encode),
+    ('masterys snmp', ('socomec', 'masterys', 'PageAdmAgentAccess.html'), UpsSocomecMasterys.SNMP_FORM,
+     masterys_snmp_decode, masterys_snmp_encode),
+    ('riello trap', ('riello', 'sentinel', 'snmp_config.html'), UpsRielloSentinel.TRAP_FORM,
+     riello_trap_decode, riello_trap_encode),
+]
+
+
+def best(func, arg, number, repeat=5):
+    return min(timeit.repeat(lambda: func(arg), number=number, repeat=repeat)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=2000, help='iterations per measurement')
+    args = parser.parse_args()
+
+    print('%-15s %12s %12s %8s %12s %12s %8s' % (
+        'form', 'old dec [us]', 'spec [us]', 'speedup', 'old enc [us]', 'spec [us]', 'speedup'))
+    for name, page, spec, decode, encode in CASES:
+        form = read_form(*page)
+        config = spec.decode(form)
+        if config != decode(form) or spec.encode(config) != encode(config):
+            raise AssertionError('%s: spec and hand written code disagree' % name)
+        d_old, d_new = best(decode, form, args.number), best(spec.decode, form, args.number)
+        e_old, e_new = best(encode, config, args.number), best(spec.encode, config, args.number)
+        print('%-15s %12.1f %12.1f %7.1fx %12.1f %12.1f %7.1fx' % (
+            name, d_old * 1e6, d_new * 1e6, d_old / d_new, e_old * 1e6, e_new * 1e6, e_old / e_new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for device web interfaces used by the benchmarks.
+
+Serves the pages captured in forms/ at the URLs drivers request, accepts
+login and config form POSTs and can add latency (per request) and limit
+bandwidth (per connection) to look like a device on a slow network. Counts
+requests and bytes in both directions.
+
+```
+server = FixtureServer(latency=0.02, bandwidth=100000)
+server.start()
+ups = UpsSocomecNetys(server.address, 'admin', 'pass')
+...
+server.stop()
+```
+
+Can also be run on its own to try drivers by hand:
+
+    python benchmarks/fixture_server.py --port 8080 --latency 0.05
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import re
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORMS = os.path.join(ROOT, 'forms')
+
+# path -> page in forms/
+PAGES = {
+    # socomec netys
+    '/': 'socomec/netys/login.htm',
+    '/net_snmpaccess1.htm': 'socomec/netys/net_snmpaccess1.htm',
+    '/net_snmptrap.htm': 'socomec/netys/net_snmptrap.htm',
+    '/info_ident.htm': 'socomec/netys/info_ident.htm',
+    '/info_status.htm': 'socomec/netys/info_status.htm',
+    '/info_battery.htm': 'socomec/netys/info_battery.htm',
+    '/info_io.htm': 'socomec/netys/info_io.htm',
+    # socomec masterys
+    '/PageMonComprehensive.html': 'socomec/masterys/PageMonIdentification.html',
+    '/PageMonIdentification.html': 'socomec/masterys/PageMonIdentification.html',
+    '/PageAdmAgentAccess.html': 'socomec/masterys/PageAdmAgentAccess.html',
+    '/PageAdmAgentTrap.html': 'socomec/masterys/PageAdmAgentTrap.html',
+    # riello netman 204
+    '/cgi-bin/login.cgi': 'riello/sentinel/login.html',
+    '/cgi-bin/snmp_config.cgi': 'riello/sentinel/snmp_config.html',
+    '/cgi-bin/view_about.cgi': 'riello/sentinel/view_about.html',
+}
+
+# only one page of the netys event log was captured, it links to pages 1-5
+PATTERNS = [
+    (re.compile(r'^/hist_log[1-5]\.htm$'), 'socomec/netys/hist_log1.htm'),
+]
+
+LOGIN = ['/tgi/login.tgi', '/cgi-bin/login.cgi']
+EMPTY = ['/cgi-bin/logout.cgi', '/cgi-bin/reboot_2.cgi']
+
+
+def page_for(path):
+    if path in PAGES:
+        return PAGES[path]
+    for pattern, page in PATTERNS:
+        if pattern.match(path):
+            return page
+    return None
+
+
+class _Counting(object):
+    """
+    Wraps socket file objects of a connection to count bytes and to throttle
+    writes to the configured bandwidth.
+    """
+
+    def __init__(self, f, server, direction):
+        self._f = f
+        self._server = server
+        self._direction = direction
+
+    def _count(self, data):
+        self._server.count(self._direction, len(data))
+        return data
+
+    def read(self, *args):
+        return self._count(self._f.read(*args))
+
+    def readline(self, *args):
+        return self._count(self._f.readline(*args))
+
+    def write(self, data):
+        # counted first, the client may go on as soon as it has the data
+        self._count(data)
+        bandwidth = self._server.bandwidth
+        if bandwidth:
+            chunk = max(1, bandwidth // 20)
+            for i in range(0, len(data), chunk):
+                self._f.write(data[i:i + chunk])
+                time.sleep(float(len(data[i:i + chunk])) / bandwidth)
+        else:
+            self._f.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.rfile = _Counting(self.rfile, self.server, 'in')
+        self.wfile = _Counting(self.wfile, self.server, 'out')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _begin(self):
+        self.server.count('requests', 1)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        return self.path.split('?')[0]
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers or []:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _page(self, path):
+        page = page_for(path)
+        if page is None:
+            return self._send(404, b'Not found')
+        if path.startswith('/Page') and not self.headers.get('Authorization'):
+            return self._send(401, b'Unauthorized', [('WWW-Authenticate', 'Basic realm="UPS"')])
+        with open(os.path.join(FORMS, page), 'rb') as f:
+            self._send(200, f.read())
+
+    def do_GET(self):
+        path = self._begin()
+        if path in EMPTY:
+            return self._send(200, b'')
+        self._page(path)
+
+    def do_POST(self):
+        path = self._begin()
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if path in LOGIN:
+            return self._send(200, b'', [('Set-Cookie', 'session=%d; Path=/' % self.server.count('logins', 1))])
+        self._send(200, b'')
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients closing keep-alive connections are not interesting
+        if self.verbose:
+            HTTPServer.handle_error(self, request, client_address)
+
+
+class FixtureServer(object):
+    def __init__(self, latency=0, bandwidth=0, tls=False, host='127.0.0.1', port=0, verbose=False):
+        """
+        :param latency: seconds added to every request
+        :param bandwidth: bytes per second sent on each connection, 0 for no limit
+        :param tls: serve https with a self-signed certificate (needs the openssl command)
+        :param port: 0 to pick a free one
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.tls = tls
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self.counters = {}
+        self._tmp = None
+        self._thread = None
+        self.httpd = _Server((host, port), FixtureHandler)
+        self.httpd.latency = latency
+        self.httpd.bandwidth = bandwidth
+        self.httpd.verbose = verbose
+        self.httpd.count = self.count
+        if tls:
+            self.httpd.socket = self._wrap(self.httpd.socket)
+        self.reset()
+
+    @property
+    def address(self):
+        """
+        host:port to give to drivers as their host
+        """
+        host, port = self.httpd.server_address[:2]
+        return '%s:%d' % (host, port)
+
+    def _wrap(self, sock):
+        self._tmp = tempfile.mkdtemp(prefix='upsconfer-bench-')
+        cert = os.path.join(self._tmp, 'cert.pem')
+        key = os.path.join(self._tmp, 'key.pem')
+        with open(os.devnull, 'w') as null:
+            subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                                   '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+                                  stdout=null, stderr=null)
+        context = ssl.SSLContext(getattr(ssl, 'PROTOCOL_TLS_SERVER', ssl.PROTOCOL_SSLv23))
+        context.load_cert_chain(cert, key)
+        return context.wrap_socket(sock, server_side=True)
+
+    def count(self, name, n):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            return self.counters[name]
+
+    def reset(self):
+        """
+        Zeroes counters and returns their previous values.
+        """
+        with self._lock:
+            counters = self.counters
+            self.counters = {'requests': 0, 'in': 0, 'out': 0, 'logins': counters.get('logins', 0)}
+            return counters
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._tmp:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def openssl_available():
+    try:
+        with open(os.devnull, 'w') as null:
+            subprocess.check_call(['openssl', 'version'], stdout=null, stderr=null)
+        return True
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve pages in forms/ like a device would.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every request')
+    parser.add_argument('--bandwidth', type=int, default=0, help='bytes per second per connection')
+    parser.add_argument('--tls', action='store_true', help='serve https')
+    args = parser.parse_args()
+
+    server = FixtureServer(args.latency, args.bandwidth, args.tls, args.host, args.port, verbose=True)
+    print('Serving forms/ on %s://%s' % ('https' if args.tls else 'http', server.address))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -13,5 +13,8 @@ setup(
     author_email='matej@arnes.si',
     description='upsconfer is a python library to get info and configure UPS devices.',
     packages=['upsconfer'],
-    install_requires=['requests', 'lxml']
+    install_requires=['requests', 'lxml', 'futures; python_version < "3"'],
+    entry_points={
+        'console_scripts': ['upsconfer=upsconfer.cli:main'],
+    },
 )
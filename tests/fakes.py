@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Fake devices for tests: a requests transport adapter that serves the pages
+in forms/ the way benchmarks/fixture_server.py does, without a network.
+"""
+
+import hashlib
+import os
+import re
+import sys
+
+import requests
+
+from upsconfer.transport import ReplayAdapter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from fixture_server import EMPTY, FORMS, LOGIN, page_for  # noqa: E402
+
+# requests after these are refused, the device is restarting
+REBOOT = ['/cgi-bin/reboot_2.cgi', '/PageAdmAgentControl.html']
+
+
+class FakeDevice(ReplayAdapter):
+    """
+    Serves forms/ for any host. `log` is a list of (method, path) of all
+    requests; set `down` to refuse connections. `content` replaces pages by
+    path. With `etags` set, pages have an ETag and conditional requests for
+    unchanged pages get 304 Not Modified.
+    """
+
+    def __init__(self, etags=False):
+        super(FakeDevice, self).__init__()
+        self.log = []
+        self.down = False
+        self.content = {}
+        self.etags = etags
+
+    def send(self, request, **kwargs):
+        path = request.path_url.split('?')[0]
+        self.log.append((request.method, path))
+        if self.down:
+            raise requests.ConnectionError('Connection refused')
+        self.down = path in REBOOT
+        entry = self.entry(request.method, path)
+        if self.etags and request.method == 'GET' and entry['status'] == 200:
+            etag = '"%s"' % hashlib.sha1(entry['content']).hexdigest()[:16]
+            if request.headers.get('If-None-Match') == etag:
+                entry = {'status': 304, 'headers': [], 'content': b''}
+            entry['headers'] = entry['headers'] + [('ETag', etag)]
+        return self.build_response(request, entry)
+
+    def entry(self, method, path):
+        headers = [('Content-Type', 'text/html')]
+        if method == 'POST' and path in LOGIN:
+            return {'status': 200, 'headers': headers + [('Set-Cookie', 'session=1; Path=/')], 'content': b''}
+        if method == 'POST' or path in EMPTY + REBOOT:
+            return {'status': 200, 'headers': headers, 'content': b''}
+        if path in self.content:
+            return {'status': 200, 'headers': headers, 'content': self.content[path]}
+        page = page_for(path)
+        if page is None:
+            return {'status': 404, 'headers': headers, 'content': b'Not found'}
+        with open(os.path.join(FORMS, page), 'rb') as f:
+            return {'status': 200, 'headers': headers, 'content': f.read()}
+
+    def requests(self, method=None):
+        """
+        :return: paths requested, with method if method is None
+        """
+        if method is None:
+            return list(self.log)
+        return [path for m, path in self.log if m == method]
+
+
+class SessionDevice(FakeDevice):
+    """
+    Checks session cookies like a Netys device: every login starts a new
+    session, and pages requested without a valid one get the login page.
+    expire() ends all sessions.
+    """
+
+    def __init__(self):
+        super(SessionDevice, self).__init__()
+        self.sessions = set()
+        self.logins = 0
+
+    def expire(self):
+        self.sessions.clear()
+
+    def send(self, request, **kwargs):
+        path = request.path_url.split('?')[0]
+        session = re.search(r'session=(\w+)', request.headers.get('Cookie', ''))
+        if path not in LOGIN + ['/'] and (session is None or session.group(1) not in self.sessions):
+            self.log.append((request.method, path))
+            return self.build_response(request, self.entry('GET', '/'))
+        return super(SessionDevice, self).send(request, **kwargs)
+
+    def entry(self, method, path):
+        if method == 'POST' and path in LOGIN:
+            self.logins += 1
+            self.sessions.add(str(self.logins))
+            return {'status': 200, 'headers': [('Content-Type', 'text/html'),
+                                               ('Set-Cookie', 'session=%d; Path=/' % self.logins)], 'content': b''}
+        return super(SessionDevice, self).entry(method, path)
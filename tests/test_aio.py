@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import sys
+import time
+import unittest
+
+from upsconfer import UpsSocomecNetys
+from upsconfer.exceptions import DeviceTimeout
+
+from tests.fakes import FakeDevice
+
+ASYNC = sys.version_info >= (3, 6)
+if ASYNC:
+    import asyncio
+    from upsconfer.aio import Device, run
+
+
+def collect(operation, timeout):
+    # no async syntax here, so Python 2 can still load (and skip) this module
+    loop = asyncio.new_event_loop()
+    results = run([Device(UpsSocomecNetys, 'ups1', 'admin', 'pass', None)], operation, timeout=timeout,
+                  adapter=FakeDevice())
+    try:
+        return [loop.run_until_complete(results.__anext__())]
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.close()
+
+
+@unittest.skipUnless(ASYNC, 'upsconfer.aio needs Python 3.6+')
+class TimeoutTest(unittest.TestCase):
+    def test_loop_timeout(self):
+        [result] = collect(lambda ups: time.sleep(0.5), timeout=0.1)
+        self.assertIsInstance(result.error, DeviceTimeout)
+        self.assertLess(result.elapsed, 0.5)
+
+    def test_value(self):
+        [result] = collect('get_snmp_config', timeout=5)
+        self.assertIsNone(result.error)
+        self.assertIn('default', result.value)
+
+
+if __name__ == '__main__':
+    unittest.main()
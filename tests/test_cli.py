@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from upsconfer import UpsRielloSentinel, UpsSocomecNetys, registry
+from upsconfer.cli import devices, main
+from upsconfer.detection import FingerprintCache
+from upsconfer.fleet import vendor_of
+
+from tests.fakes import FakeDevice
+
+
+class FakeNetys(UpsSocomecNetys):
+    device = FakeDevice()
+
+    def __init__(self, host, user, password, **kwargs):
+        kwargs.setdefault('adapter', self.device)
+        super(FakeNetys, self).__init__(host, user, password, **kwargs)
+
+
+registry.register('FakeNetys', FakeNetys)
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.inventory = self.write('devices.csv', 'host,driver\nups1,FakeNetys\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def run_cli(self, *args):
+        output = os.path.join(self.dir, 'out.jsonl')
+        status = main(list(args) + [self.inventory, '--user', 'admin', '--password', 'pass', '-o', output])
+        with open(output) as f:
+            return status, [json.loads(line) for line in f]
+
+    def test_config_numbers(self):
+        # entry 1 of forms/socomec/netys/net_snmptrap.htm is an SNMPv1 receiver
+        config = self.write('trap.json', json.dumps({1: {'version': 1, 'severity': 'info'}}))
+        status, [result] = self.run_cli('set-trap', '--config', config, '--dry-run')
+        self.assertEqual(status, 0)
+        self.assertEqual(result['driver'], 'FakeNetys')
+        self.assertFalse(result['value']['changed'])
+
+        config = self.write('trap.json', json.dumps({1: {'version': 2}}))
+        status, [result] = self.run_cli('set-trap', '--config', config, '--dry-run')
+        self.assertTrue(result['value']['changed'])
+        self.assertEqual(result['value']['changes'], [['1', 'version', '1', '2']])
+
+    def test_remembered_drivers(self):
+        with FingerprintCache(os.path.join(self.dir, 'fingerprints.json')) as cache:
+            cache.remember('ups2', UpsRielloSentinel)
+            cache.remember('ups4', 'UpsGone')
+            rows = [{'host': 'ups1', 'driver': 'FakeNetys'}, {'host': 'ups2'}, {'host': 'ups3'}, {'host': 'ups4'}]
+            undetected = []
+            found = list(devices(rows, cache=cache, undetected=undetected.append))
+        self.assertEqual([d.driver for d in found[:2]], [FakeNetys, UpsRielloSentinel])
+        self.assertEqual(vendor_of(found[1].driver), 'riello')
+        self.assertEqual(undetected, ['ups3', 'ups4'])
+        self.assertEqual(len(set(d.driver for d in found[2:])), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+import upsconfer
+import upsconfer.detection as detection
+from upsconfer import UpsRielloSentinel, UpsSocomecNetys
+from upsconfer.detection import FingerprintCache
+
+from tests.fakes import FakeDevice
+
+
+class DetectTest(unittest.TestCase):
+    def test_module_and_function(self):
+        self.assertTrue(callable(upsconfer.detect))
+        self.assertTrue(hasattr(detection, 'FingerprintCache'))
+        self.assertTrue(hasattr(detection, 'probe'))
+
+    def test_detect(self):
+        ups = upsconfer.detect('ups1', 'admin', 'pass', adapter=FakeDevice())
+        self.assertIsInstance(ups, UpsSocomecNetys)
+
+
+class FingerprintCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'cache', 'fingerprints.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_written_on_flush(self):
+        cache = FingerprintCache(self.path)
+        for i in range(100):
+            cache.remember('ups%d' % i, UpsRielloSentinel, mac='00:02:63:00:00:%02x' % i)
+        self.assertFalse(os.path.exists(self.path))
+        cache.flush()
+        self.assertFalse(cache.dirty)
+        mtime = os.stat(self.path).st_mtime
+        cache.flush()
+        self.assertEqual(os.stat(self.path).st_mtime, mtime)
+        other = FingerprintCache(self.path)
+        self.assertEqual(other.lookup('ups7'), 'UpsRielloSentinel')
+        self.assertEqual(other.lookup(mac='00-02-63-00-00-07'), 'UpsRielloSentinel')
+
+    def test_with_block(self):
+        with FingerprintCache(self.path) as cache:
+            cache.remember('ups1', 'UpsSocomecNetys')
+            cache.forget('ups1')
+            cache.remember('ups2', 'UpsSocomecNetys')
+        self.assertEqual(FingerprintCache(self.path).hosts.keys(), {'ups2': None}.keys())
+
+
+if __name__ == '__main__':
+    unittest.main()
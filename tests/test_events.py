@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import itertools
+import json
+import unittest
+
+from upsconfer.events import EventReader
+
+
+def log(*numbers):
+    return [{'time': '01/01/2017 00:00:%02d' % n, 'event': 'Event %d' % n} for n in numbers]
+
+
+class EventLog(object):
+    def __init__(self, events, page_size=4):
+        self.events = events
+        self.page_size = page_size
+        self.pages_read = 0
+
+    def add(self, *numbers):
+        self.events = log(*numbers) + self.events
+
+    def pages(self):
+        for i in range(0, len(self.events), self.page_size):
+            self.pages_read += 1
+            yield self.events[i:i + self.page_size]
+
+    def read(self, since=None, n=None):
+        reader = EventReader(self.pages(), since)
+        events = [e['event'] for e in itertools.islice(reader, n)]
+        # cursors are stored as JSON
+        return events, json.loads(json.dumps(reader.cursor))
+
+
+def names(*numbers):
+    return ['Event %d' % n for n in numbers]
+
+
+class EventReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.log = EventLog(log(10, 9, 8, 7, 6, 5, 4, 3, 2, 1))
+
+    def test_new_events(self):
+        events, cursor = self.log.read()
+        self.assertEqual(events, names(10, 9, 8, 7, 6, 5, 4, 3, 2, 1))
+        self.log.add(11)
+        self.log.pages_read = 0
+        events, cursor = self.log.read(cursor)
+        self.assertEqual(events, names(11))
+        self.assertEqual(self.log.pages_read, 1)
+        self.assertEqual(self.log.read(cursor)[0], [])
+
+    def test_resume(self):
+        events, cursor = self.log.read(n=3)
+        self.assertEqual(events, names(10, 9, 8))
+        self.log.add(11)
+        events, cursor = self.log.read(cursor, n=3)
+        self.assertEqual(events, names(11, 7, 6))
+        events, cursor = self.log.read(cursor)
+        self.assertEqual(events, names(5, 4, 3, 2, 1))
+        self.assertEqual(cursor, [[[['01/01/2017 00:00:%02d' % n, 'Event %d' % n] for n in (11, 10, 9)], None]])
+        self.assertEqual(self.log.read(cursor)[0], [])
+
+    def test_resume_after_seen(self):
+        events, cursor = self.log.read(n=10)
+        self.log.add(14, 13, 12, 11)
+        events, cursor = self.log.read(cursor, n=2)
+        self.assertEqual(events, names(14, 13))
+        events, cursor = self.log.read(cursor)
+        self.assertEqual(events, names(12, 11))
+
+    def test_repeated_timestamps(self):
+        self.log.events = [dict(e, time='same') for e in self.log.events]
+        events, cursor = self.log.read(n=1)
+        self.log.add(11)
+        self.log.events[0]['time'] = 'same'
+        self.assertEqual(self.log.read(cursor)[0], names(11, 9, 8, 7, 6, 5, 4, 3, 2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
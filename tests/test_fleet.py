@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import requests
+
+from upsconfer import UpsRielloSentinel, UpsSocomecNetys
+from upsconfer.exceptions import DeviceTimeout
+from upsconfer.fleet import Device, run, run_device
+
+from tests.fakes import FakeDevice
+
+
+class QuickRiello(UpsRielloSentinel):
+    # no pauses between retries of refused connections
+    retries = 0
+
+
+class LostResponse(FakeDevice):
+    """
+    Acts on requests for paths in `lost`, but times out instead of responding.
+    """
+
+    def __init__(self, *lost):
+        super(LostResponse, self).__init__()
+        self.lost = lost
+
+    def send(self, request, **kwargs):
+        response = super(LostResponse, self).send(request, **kwargs)
+        if request.path_url in self.lost:
+            raise requests.exceptions.ReadTimeout('Read timed out')
+        return response
+
+
+class RebootTest(unittest.TestCase):
+    def test_reboot_succeeds_on_device_that_stops_answering(self):
+        device = FakeDevice()
+        results = list(run([Device(QuickRiello, 'ups1', 'admin', 'pass')], 'reboot', adapter=device))
+        self.assertEqual(len(results), 1)
+        self.assertIsNone(results[0].error)
+        self.assertTrue(results[0].value)
+        self.assertTrue(device.down)
+        self.assertNotIn('/cgi-bin/logout.cgi', device.requests('GET'))
+
+    def test_reboot_with_retries(self):
+        device = FakeDevice()
+        self.assertTrue(run_device(Device(UpsRielloSentinel, 'ups1', 'admin', 'pass'), 'reboot', adapter=device))
+        self.assertEqual(device.requests('GET')[-1], '/cgi-bin/reboot_2.cgi')
+
+    def test_reboot_is_not_retried(self):
+        device = LostResponse('/cgi-bin/reboot_2.cgi')
+        ups = UpsRielloSentinel('ups1', 'admin', 'pass', adapter=device)
+        ups.retry_backoff = 0
+        ups.login()
+        with self.assertRaises(DeviceTimeout):
+            ups.reboot()
+        self.assertEqual(device.requests('GET').count('/cgi-bin/reboot_2.cgi'), 1)
+
+    def test_logout_is_not_retried(self):
+        device = LostResponse('/cgi-bin/logout.cgi')
+        ups = UpsRielloSentinel('ups1', 'admin', 'pass', adapter=device)
+        ups.retry_backoff = 0
+        ups.login()
+        ups.get_info()
+        with self.assertRaises(DeviceTimeout):
+            ups.logout()
+        self.assertEqual(device.requests('GET').count('/cgi-bin/logout.cgi'), 1)
+
+    def test_pages_are_retried(self):
+        device = LostResponse('/cgi-bin/view_about.cgi')
+        ups = UpsRielloSentinel('ups1', 'admin', 'pass', adapter=device)
+        ups.retry_backoff = 0
+        ups.login()
+        with self.assertRaises(DeviceTimeout):
+            ups.get_info()
+        self.assertEqual(device.requests('GET').count('/cgi-bin/view_about.cgi'), 1 + ups.retries)
+
+    def test_logout_error_after_success_is_ignored(self):
+        device = FakeDevice()
+
+        def operation(ups):
+            info = ups.get_info()
+            device.down = True
+            return info
+
+        info = run_device(Device(QuickRiello, 'ups1', 'admin', 'pass'), operation, adapter=device)
+        self.assertEqual(info['manufacturer'], 'Riello')
+        self.assertEqual(device.requests('GET')[-1], '/cgi-bin/logout.cgi')
+
+    def test_operation_error_is_kept(self):
+        device = FakeDevice()
+
+        def operation(ups):
+            device.down = True
+            return ups.get_info()
+
+        with self.assertRaises(requests.ConnectionError):
+            run_device(Device(QuickRiello, 'ups1', 'admin', 'pass'), operation, adapter=device)
+
+    def test_logout_after_plain_operation(self):
+        device = FakeDevice()
+        run_device(Device(UpsRielloSentinel, 'ups1', 'admin', 'pass'), 'get_info', adapter=device)
+        self.assertEqual(device.requests('GET')[-1], '/cgi-bin/logout.cgi')
+        run_device(Device(UpsSocomecNetys, 'ups2', 'admin', 'pass'), 'reboot', adapter=device)
+
+
+if __name__ == '__main__':
+    unittest.main()
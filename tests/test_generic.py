@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import requests
+
+import upsconfer.generic as generic
+from upsconfer import UpsRielloSentinel, UpsSocomecMasterys, UpsSocomecNetys
+from upsconfer.exceptions import DeviceTimeout
+
+from tests.fakes import FakeDevice
+
+
+def logged_in(driver, device=None, **kwargs):
+    ups = driver('ups1', 'admin', 'pass', adapter=device or FakeDevice(), **kwargs)
+    ups.login()
+    return ups
+
+
+class GetAllTest(unittest.TestCase):
+    def test_default_sections(self):
+        result = logged_in(UpsSocomecNetys).get_all()
+        self.assertEqual(sorted(result), ['info', 'snmp', 'trap'])
+
+    def test_status(self):
+        result = logged_in(UpsSocomecNetys).get_all(['status'])
+        self.assertIn('alarms', result['status'])
+
+    def test_unknown_section(self):
+        for driver in (UpsRielloSentinel, UpsSocomecMasterys):
+            with self.assertRaises(ValueError):
+                logged_in(driver).get_all(['status'])
+        with self.assertRaises(ValueError):
+            logged_in(UpsSocomecNetys).get_all(['nothing'])
+
+
+class Flaky(FakeDevice):
+    """
+    Fails the first `failures` requests to `path` with `error`, records timeouts of all requests.
+    """
+
+    def __init__(self, path, failures, error=requests.exceptions.ConnectTimeout):
+        super(Flaky, self).__init__()
+        self.path = path
+        self.failures = failures
+        self.error = error
+        self.timeouts = []
+
+    def send(self, request, **kwargs):
+        self.timeouts.append(kwargs.get('timeout'))
+        if request.path_url == self.path and self.failures:
+            self.failures -= 1
+            self.log.append((request.method, request.path_url))
+            raise self.error('failed')
+        return super(Flaky, self).send(request, **kwargs)
+
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        # pauses are recorded instead of slept, random ones are the longest possible
+        self.pauses = []
+        self.patch(generic.time, 'sleep', self.pauses.append)
+        self.patch(generic.random, 'uniform', lambda low, high: high)
+
+    def patch(self, owner, name, value):
+        original = getattr(owner, name)
+        setattr(owner, name, value)
+        self.addCleanup(setattr, owner, name, original)
+
+    def test_get_retried(self):
+        device = Flaky('/info_ident.htm', 2)
+        info = logged_in(UpsSocomecNetys, device).get_info()
+        self.assertEqual(info['manufacturer'], 'Socomec')
+        self.assertEqual(device.requests('GET').count('/info_ident.htm'), 3)
+        self.assertEqual(self.pauses, [0.5, 1.0])
+
+    def test_retries_exhausted(self):
+        device = Flaky('/info_ident.htm', 5)
+        ups = logged_in(UpsSocomecNetys, device)
+        with self.assertRaises(DeviceTimeout):
+            ups.get_info()
+        self.assertEqual(device.requests('GET').count('/info_ident.htm'), 1 + ups.retries)
+
+        device = Flaky('/info_ident.htm', 5, requests.exceptions.ConnectionError)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            logged_in(UpsSocomecNetys, device).get_info()
+
+    def test_post_not_retried(self):
+        device = Flaky('/tgi/login.tgi', 1)
+        with self.assertRaises(DeviceTimeout):
+            logged_in(UpsSocomecNetys, device)
+        self.assertEqual(device.requests('POST'), ['/tgi/login.tgi'])
+        self.assertEqual(self.pauses, [])
+
+    def test_no_retry_errors(self):
+        device = Flaky('/info_ident.htm', 1, requests.exceptions.SSLError)
+        with self.assertRaises(requests.exceptions.SSLError):
+            logged_in(UpsSocomecNetys, device).get_info()
+        self.assertEqual(device.requests('GET').count('/info_ident.htm'), 1)
+
+    def test_timeouts(self):
+        device = Flaky('/none', 0)
+        ups = logged_in(UpsSocomecNetys, device)
+        self.assertEqual(device.timeouts[-1], (ups.connect_timeout, ups.read_timeout))
+        with ups.budget(5):
+            ups.get_info()
+        connect, read = device.timeouts[-1]
+        self.assertTrue(0 < connect <= 5 and 0 < read <= 5)
+
+    def test_budget_spent(self):
+        device = Flaky('/none', 0)
+        ups = logged_in(UpsSocomecNetys, device)
+        requested = len(device.log)
+        with ups.budget(0):
+            with self.assertRaises(DeviceTimeout):
+                ups.get_info()
+        self.assertEqual(len(device.log), requested)
+        # the budget ends with the block
+        self.assertEqual(ups.get_info()['manufacturer'], 'Socomec')
+
+    def test_no_retry_past_budget(self):
+        device = Flaky('/info_ident.htm', 1)
+        ups = logged_in(UpsSocomecNetys, device)
+        ups.retry_backoff = 10
+        with ups.budget(5):
+            with self.assertRaises(DeviceTimeout):
+                ups.get_info()
+        self.assertEqual(self.pauses, [])
+        self.assertEqual(device.requests('GET').count('/info_ident.htm'), 1)
+
+    def test_nested_budget(self):
+        ups = logged_in(UpsSocomecNetys)
+        with ups.budget(100):
+            outer = ups.deadline
+            with ups.budget(1000):
+                self.assertEqual(ups.deadline, outer)
+            with ups.budget(1):
+                self.assertLess(ups.deadline, outer)
+            self.assertEqual(ups.deadline, outer)
+        self.assertIsNone(ups.deadline)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from upsconfer import UpsSocomecNetys
+from upsconfer.metrics import Metrics
+
+from tests.fakes import FakeDevice
+
+
+class HooksTest(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.ups = UpsSocomecNetys('ups1', 'admin', 'pass', adapter=FakeDevice(),
+                                   hooks=[lambda event, labels, seconds: self.events.append((event, labels))])
+        self.ups.login()
+        self.ups.get_snmp_config()
+
+    def labels(self, event, path):
+        return [labels for e, labels in self.events if e == event and labels['path'] == path]
+
+    def test_request_labels(self):
+        labels = self.labels('request', '/net_snmpaccess1.htm')
+        self.assertEqual(len(labels), 1)
+        self.assertEqual(labels[0]['method'], 'GET')
+        self.assertEqual(labels[0]['status'], '200')
+        self.assertEqual(labels[0]['driver'], 'UpsSocomecNetys')
+        self.assertEqual(labels[0]['host'], 'ups1')
+
+    def test_parse_labels(self):
+        labels = self.labels('parse', '/net_snmpaccess1.htm')
+        self.assertEqual(labels, [{'driver': 'UpsSocomecNetys', 'path': '/net_snmpaccess1.htm', 'host': 'ups1'}])
+        for event, labels in self.events:
+            if event == 'parse':
+                self.assertNotIn('method', labels)
+
+
+class MetricsTest(unittest.TestCase):
+    def test_prometheus(self):
+        metrics = Metrics(exclude=('host',))
+        ups = UpsSocomecNetys('ups1', 'admin', 'pass', adapter=FakeDevice(), hooks=[metrics])
+        ups.login()
+        ups.get_info()
+        text = metrics.to_prometheus()
+        self.assertIn('upsconfer_parse_seconds_count{driver="UpsSocomecNetys",path="/info_ident.htm"} 1', text)
+        self.assertIn('upsconfer_request_seconds_count{driver="UpsSocomecNetys",method="GET",'
+                      'path="/info_ident.htm",status="200"} 1', text)
+        self.assertNotIn('host=', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
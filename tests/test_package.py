@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+import unittest
+
+from upsconfer import registry
+
+
+class StarImportTest(unittest.TestCase):
+    def test_drivers(self):
+        namespace = {}
+        exec('from upsconfer import *', namespace)
+        for name in registry.BUILTIN:
+            self.assertIs(namespace[name], registry.get(name))
+        self.assertIn('detect', namespace)
+        self.assertIn('__version__', namespace)
+
+    def test_lazy(self):
+        # a fresh interpreter, drivers of this one are imported already
+        code = 'import sys, upsconfer; print("upsconfer.socomec" in sys.modules)'
+        output = subprocess.check_output([sys.executable, '-c', code]).decode().strip()
+        self.assertEqual(output, 'True' if sys.version_info < (3, 7) else 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
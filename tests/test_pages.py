@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+from upsconfer import UpsSocomecNetys
+from upsconfer.pages import PageStore
+
+from tests.fakes import FORMS, FakeDevice
+
+PATH = '/net_snmpaccess1.htm'
+
+
+class UnchangedPagesTest(unittest.TestCase):
+    def setUp(self):
+        self.store = PageStore()
+        self.events = []
+
+    def ups(self, device):
+        ups = UpsSocomecNetys('ups1', 'admin', 'pass', adapter=device, page_store=self.store,
+                              hooks=[lambda event, labels, seconds: self.events.append((event, labels))])
+        ups.login()
+        self.events = []
+        return ups
+
+    def requests(self):
+        return [labels['status'] for event, labels in self.events if event == 'request' and labels['path'] == PATH]
+
+    def parsed(self):
+        return len([e for e, labels in self.events if e == 'parse' and labels['path'] == PATH])
+
+    def test_not_modified(self):
+        device = FakeDevice(etags=True)
+        first = self.ups(device).get_snmp_config()
+        self.assertTrue(first.changed)
+        second = self.ups(device).get_snmp_config()
+        self.assertFalse(second.changed)
+        self.assertEqual(second, first)
+        # the device was asked with If-None-Match and the page was not parsed
+        self.assertEqual(self.requests(), ['304'])
+        self.assertEqual(self.parsed(), 0)
+
+    def test_same_content_without_etag(self):
+        device = FakeDevice()
+        first = self.ups(device).get_snmp_config()
+        second = self.ups(device).get_snmp_config()
+        self.assertFalse(second.changed)
+        self.assertEqual(second, first)
+        self.assertEqual(self.requests(), ['200'])
+        self.assertEqual(self.parsed(), 0)
+
+    def test_changed_page(self):
+        for device in (FakeDevice(), FakeDevice(etags=True)):
+            self.store.forget()
+            self.ups(device).get_snmp_config()
+            with open(os.path.join(FORMS, 'socomec/netys/net_snmpaccess1.htm'), 'rb') as f:
+                device.content[PATH] = f.read().replace(b'public', b'private')
+            config = self.ups(device).get_snmp_config()
+            self.assertTrue(config.changed)
+            self.assertEqual(config['default']['community'], 'private')
+            # the page downloaded to compare its hash is parsed, not downloaded again
+            self.assertEqual(self.requests(), ['200'])
+            self.assertEqual(self.parsed(), 1)
+
+    def test_same_session(self):
+        ups = self.ups(FakeDevice(etags=True))
+        ups.get_snmp_config()
+        self.assertFalse(ups.get_snmp_config().changed)
+        self.assertEqual(self.requests(), ['200'])
+
+    def test_forget(self):
+        device = FakeDevice(etags=True)
+        self.ups(device).get_snmp_config()
+        self.store.forget('ups1')
+        self.assertTrue(self.ups(device).get_snmp_config().changed)
+        self.assertEqual(self.requests(), ['200'])
+
+
+if __name__ == '__main__':
+    unittest.main()
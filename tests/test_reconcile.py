@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from upsconfer import UpsSocomecNetys
+from upsconfer import reconcile as rc
+from upsconfer.fleet import Device
+from upsconfer.inventory import Inventory
+
+from tests.fakes import FakeDevice
+
+# entry 1 of forms/socomec/netys/net_snmptrap.htm
+TRAP_1 = {'ip': '192.168.18.173', 'community': 'commstr', 'severity': 'info', 'version': '1', 'type': 'proprietary'}
+
+STATE = rc.DesiredState({
+    'change': {'hosts': ['ups-a*'], 'trap': {'1': {'community': 'traps'}}},
+    'same': {'hosts': ['ups-b*'], 'trap': {1: {'community': 'commstr', 'version': 1}}},
+    'other': {'hosts': ['*'], 'drivers': ['UpsRielloSentinel'], 'snmp': {'default': {'community': 'x'}}},
+})
+
+
+class QuickNetys(UpsSocomecNetys):
+    # refused connections fail right away
+    retries = 0
+
+
+class ReconcileTest(unittest.TestCase):
+    def setUp(self):
+        self.adapters = {}
+        self.devices = [self.device(host) for host in ('ups-a1', 'ups-b1', 'ups-c1', 'ups-a2')]
+        self.adapters['ups-a2'].down = True
+
+    def device(self, host):
+        self.adapters[host] = FakeDevice()
+        return Device(QuickNetys, host, 'admin', 'pass', {'adapter': self.adapters[host]})
+
+    def statuses(self, report):
+        return dict((o.device.host, o.status) for o in report)
+
+    def posts(self, host):
+        return [path for path in self.adapters[host].requests('POST') if path != '/tgi/login.tgi']
+
+    def test_dry_run(self):
+        report = rc.reconcile(STATE, self.devices, dry_run=True)
+        self.assertEqual(self.statuses(report), {
+            'ups-a1': rc.PLANNED, 'ups-b1': rc.UNCHANGED, 'ups-c1': rc.UNMANAGED, 'ups-a2': rc.FAILED})
+        planned = report.by_status(rc.PLANNED)[0]
+        self.assertEqual(planned.changes['trap'].changes, [('1', 'community', 'commstr', 'traps')])
+        self.assertEqual(self.adapters['ups-c1'].log, [])
+        for host in self.adapters:
+            self.assertEqual(self.posts(host), [])
+        self.assertEqual(report.counts(), {rc.PLANNED: 1, rc.UNCHANGED: 1, rc.UNMANAGED: 1, rc.FAILED: 1})
+
+    def test_apply(self):
+        inventory = Inventory()
+        inventory.store('ups-a1', UpsSocomecNetys, trap={'1': TRAP_1})
+        report = rc.reconcile(STATE, self.devices, inventory=inventory)
+        self.assertEqual(self.statuses(report)['ups-a1'], rc.CHANGED)
+        self.assertEqual(self.statuses(report)['ups-b1'], rc.UNCHANGED)
+        self.assertEqual(self.posts('ups-a1'), ['/tgi/net_trapaccess.tgi'])
+        self.assertEqual(self.posts('ups-b1'), [])
+        self.assertFalse(inventory.is_fresh('ups-a1', 3600))
+        self.assertIsInstance(report.failed[0].error, Exception)
+
+    def test_inventory_in_sync(self):
+        inventory = Inventory()
+        inventory.store('ups-b1', UpsSocomecNetys, trap={'1': TRAP_1})
+        inventory.store('ups-a1', UpsSocomecNetys, trap={'1': TRAP_1}, updated=0)
+        planned = rc.plan(STATE, self.devices, inventory=inventory, ttl=3600)
+        self.assertEqual([(o.device.host, o.status) for o in planned.skipped],
+                         [('ups-b1', rc.IN_SYNC), ('ups-c1', rc.UNMANAGED)])
+        # the snapshot of ups-a1 is too old to be trusted
+        self.assertEqual([device.host for device, config in planned.todo], ['ups-a1', 'ups-a2'])
+        self.assertEqual(planned.todo[0][1], {'trap': {'1': {'community': 'traps'}}})
+
+        report = rc.reconcile(STATE, self.devices, inventory=inventory, ttl=3600)
+        self.assertEqual(self.statuses(report)['ups-b1'], rc.IN_SYNC)
+        self.assertEqual(self.adapters['ups-b1'].log, [])
+
+    def test_conflicting_groups(self):
+        state = rc.DesiredState({
+            'a': {'hosts': ['ups-*'], 'trap': {'1': {'community': 'one'}}},
+            'b': {'hosts': ['ups-a*'], 'trap': {'1': {'community': 'two', 'ip': '10.0.0.1'}}},
+        })
+        self.assertEqual(state.config_for('ups-b1', UpsSocomecNetys), {'trap': {'1': {'community': 'one'}}})
+        with self.assertRaises(ValueError):
+            state.config_for('ups-a1', UpsSocomecNetys)
+        # found while planning, before any device is contacted
+        with self.assertRaises(ValueError):
+            rc.reconcile(state, self.devices, dry_run=True)
+        self.assertEqual(self.adapters['ups-b1'].log, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
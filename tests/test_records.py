@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import pickle
+import unittest
+
+from upsconfer import UpsSocomecNetys
+from upsconfer.pages import PageStore
+from upsconfer.records import DeviceInfo, TrapEntry
+
+from tests.fakes import FakeDevice
+
+
+class TypedResultTest(unittest.TestCase):
+    def setUp(self):
+        self.store = PageStore()
+
+    def get(self, getter):
+        ups = UpsSocomecNetys('ups1', 'admin', 'pass', adapter=FakeDevice(), typed=True, page_store=self.store)
+        ups.login()
+        return getattr(ups, getter)()
+
+    def test_info_changed(self):
+        first = self.get('get_info')
+        second = self.get('get_info')
+        self.assertIsInstance(first, DeviceInfo)
+        self.assertTrue(first.changed)
+        self.assertFalse(second.changed)
+        self.assertEqual(first, second)
+        self.assertNotIn('changed', second.keys())
+
+    def test_config_changed(self):
+        self.assertTrue(self.get('get_trap_config').changed)
+        self.assertFalse(self.get('get_trap_config').changed)
+
+
+class RecordTest(unittest.TestCase):
+    def test_info(self):
+        info = DeviceInfo(model='NETYS', rating_va='2200')
+        self.assertEqual(info.rating_va, 2200)
+        self.assertTrue(info.changed)
+        self.assertEqual(info.to_dict(), {'model': 'NETYS', 'rating_va': 2200})
+        self.assertEqual(pickle.loads(pickle.dumps(info)), info)
+        with self.assertRaises(AttributeError):
+            info.changed = False
+
+    def test_shared(self):
+        values = {'ip': '10.0.0.1', 'community': 'public', 'version': '1'}
+        self.assertIs(TrapEntry.from_dict(values), TrapEntry.from_dict(dict(values)))
+
+    def test_diff(self):
+        entry = TrapEntry(ip='10.0.0.1', community='public', severity='none')
+        self.assertEqual(entry.diff({'ip': '10.0.0.2', 'community': 'public', 'severity': 'info'}),
+                         [('ip', '10.0.0.1', '10.0.0.2'), ('severity', 'none', 'info')])
+
+
+if __name__ == '__main__':
+    unittest.main()
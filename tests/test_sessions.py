@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from upsconfer import UpsSocomecNetys
+from upsconfer.sessions import SessionStore
+
+from tests.fakes import SessionDevice
+
+
+class SessionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.directory = os.path.join(self.tmp, 'sessions')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_save_load(self):
+        store = SessionStore(self.directory)
+        store.save('ups1', 'admin', {'session': '1'})
+        self.assertEqual(store.load('ups1', 'admin'), {'session': '1'})
+        self.assertIsNone(store.load('ups1', 'other'))
+        self.assertIsNone(store.load('ups2', 'admin'))
+        self.assertEqual([f for f in os.listdir(self.directory) if f.endswith('.tmp')], [])
+
+    def test_max_age(self):
+        SessionStore(self.directory).save('ups1', 'admin', {'session': '1'})
+        self.assertIsNone(SessionStore(self.directory, max_age=-1).load('ups1', 'admin'))
+
+    def test_discard(self):
+        store = SessionStore(self.directory)
+        store.save('ups1', 'admin', {'session': '1'})
+        store.discard('ups1', 'admin')
+        store.discard('ups1', 'admin')
+        self.assertIsNone(store.load('ups1', 'admin'))
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = SessionStore(self.tmp)
+        self.device = SessionDevice()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def ups(self):
+        ups = UpsSocomecNetys('ups1', 'admin', 'pass', adapter=self.device, session_store=self.store)
+        ups.login()
+        return ups
+
+    def test_resume(self):
+        self.ups().close()
+        self.assertEqual(self.store.load('ups1', 'admin'), {'session': '1'})
+        config = self.ups().get_snmp_config()
+        self.assertEqual(self.device.logins, 1)
+        self.assertIn('default', config)
+
+    def test_expired_session(self):
+        self.ups().close()
+        self.device.expire()
+        ups = self.ups()
+        self.assertEqual(self.device.logins, 1)
+        # the device answers with the login page, the driver logs in and asks again
+        config = ups.get_snmp_config()
+        self.assertIn('default', config)
+        self.assertEqual(self.device.logins, 2)
+        self.assertEqual(self.device.requests('GET').count('/net_snmpaccess1.htm'), 2)
+        self.assertEqual(self.store.load('ups1', 'admin'), {'session': '2'})
+        self.assertFalse(ups._resumed)
+
+    def test_logout_keeps_session(self):
+        # Netys has no logout, the saved session is reused by the next process
+        ups = self.ups()
+        ups.get_info()
+        ups.logout()
+        self.ups().get_info()
+        self.assertEqual(self.device.logins, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from upsconfer import UpsSocomecNetys
+from upsconfer.spec import Field, FormSpec, Rows, ValueMap
+
+from tests.fakes import FakeDevice
+
+TRAP_FORM = FormSpec([
+    Rows([('1', 1), ('2', 2)], [
+        Field('ip', 'NMS{row}', strip=True),
+        Field('severity', 'PER{row}', ValueMap({'none': 'non', 'info': 'inf'}, form_default='non')),
+        Field(('severity2', 'type'), 'X{row}', default='1', missing=('', 'rfc'),
+              decode=lambda value: ('info', 'rfc') if value == '1' else ('none', 'proprietary'),
+              encode=lambda value: '%s/%s' % value),
+        Field('alias', 'AL{row}', default='', write=False),
+    ], constants={'version': '1'}),
+], form_constants={'Submit': 'Submit'})
+
+FORM = {'NMS1': ' 10.0.0.1 ', 'PER1': 'inf', 'X1': '2', 'AL1': 'nms',
+        'NMS2': '0.0.0.0', 'PER2': 'bad'}
+
+
+class FormSpecTest(unittest.TestCase):
+    def test_decode(self):
+        self.assertEqual(TRAP_FORM.decode(FORM), {
+            '1': {'ip': '10.0.0.1', 'severity': 'info', 'severity2': 'none', 'type': 'proprietary',
+                  'alias': 'nms', 'version': '1'},
+            '2': {'ip': '0.0.0.0', 'severity': None, 'severity2': 'info', 'type': 'rfc', 'alias': '',
+                  'version': '1'},
+        })
+
+    def test_encode(self):
+        config = {
+            '1': {'ip': '10.0.0.1', 'severity': 'info', 'severity2': 'info', 'type': 'rfc', 'alias': 'x'},
+            '2': {'ip': '', 'severity': 'crit'},
+        }
+        self.assertEqual(TRAP_FORM.encode(config), {
+            'Submit': 'Submit', 'NMS1': '10.0.0.1', 'PER1': 'inf', 'X1': 'info/rfc',
+            'NMS2': '', 'PER2': 'non', 'X2': '/rfc',
+        })
+
+    def test_encode_numbers(self):
+        config = {'1': {'ip': 10, 'severity': 'info', 'severity2': 'info', 'type': 'rfc'}, '2': {'ip': None, 'severity': 'none'}}
+        data = TRAP_FORM.encode(config)
+        self.assertEqual(data['NMS1'], '10')
+        self.assertIsNone(data['NMS2'])
+        spec = FormSpec([Rows([('1', 1)], [Field('version', 'V{row}', ValueMap({'1': '0', '2': '1'}))])])
+        self.assertEqual(spec.encode({'1': {'version': 1}}), {'V1': '0'})
+        self.assertEqual(spec.encode({'1': {'version': 2}}), {'V1': '1'})
+
+    def test_required(self):
+        with self.assertRaises(KeyError):
+            TRAP_FORM.decode({'NMS1': '10.0.0.1'})
+        with self.assertRaises(KeyError):
+            TRAP_FORM.encode({'1': {'ip': ''}})
+
+    def test_value_map_unique(self):
+        with self.assertRaises(ValueError):
+            ValueMap({'a': '1', 'b': '1'})
+
+
+class SetConfigTest(unittest.TestCase):
+    def test_numbers_equal_strings(self):
+        ups = UpsSocomecNetys('ups1', 'admin', 'pass', adapter=FakeDevice())
+        ups.login()
+        entry = dict(ups.get_trap_config()['1'])
+        self.assertEqual(entry['version'], '1')
+        report = ups.set_trap_config({'1': dict(entry, version=1)}, dry_run=True)
+        self.assertEqual(report.changes, [])
+        self.assertFalse(report.changed)
+        self.assertEqual(report.fields, {})
+        report = ups.set_trap_config({'1': dict(entry, version=2)}, dry_run=True)
+        self.assertEqual(report.changes, [('1', 'version', '1', 2)])
+        self.assertEqual(report.fields, {'TTT1': ('0', '1')})
+
+
+if __name__ == '__main__':
+    unittest.main()
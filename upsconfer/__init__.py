@@ -20,7 +20,32 @@
 #
 ########################################################################
 
+"""
+Drivers are imported on first use (see upsconfer.registry), so
+`import upsconfer` does not import requests and lxml. Python before 3.7 has
+no module __getattr__, there they are imported right away.
+"""
 
-from .socomec import UpsSocomecNetys, UpsSocomecMasterys
-from .riello import UpsRielloSentinel
+import sys
+from .detection import detect
 from .version import __version__
+from . import registry
+
+# star imports resolve drivers through __getattr__ too
+__all__ = ['detect', '__version__'] + sorted(registry.BUILTIN)
+
+if sys.version_info < (3, 7):
+    from .socomec import UpsSocomecNetys, UpsSocomecMasterys
+    from .riello import UpsRielloSentinel
+
+
+def __getattr__(name):
+    if name in registry.BUILTIN:
+        driver = registry.get(name)
+        globals()[name] = driver
+        return driver
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(registry.BUILTIN))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Running operations on many devices concurrently from asyncio code.
+
+Drivers are blocking, so each device is handled in a worker thread while the
+event loop enforces concurrency limits and timeouts. Requires Python 3.6+.
+
+```
+devices = [Device(UpsSocomecNetys, 'ups1.example.com', 'admin', 'pass'), ...]
+async for result in run(devices, 'get_info', concurrency=100, vendor_concurrency={'riello': 20}, timeout=60):
+    print(result.device.host, result.value or result.error)
+```
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from upsconfer.exceptions import DeviceTimeout
+from upsconfer.fleet import Device, Result, as_device, run_device, vendor_of
+
+
+async def run(devices, operation, args=(), kwargs=None, concurrency=50, vendor_concurrency=None,
+              timeout=None, executor=None, **driver_kwargs):
+    """
+    Runs operation on all devices and yields a Result for each device as soon
+    as it completes.
+
+    When a device times out its Result has a DeviceTimeout as error, both when
+    the driver runs out of its time budget (timeout is also given to the driver
+    as its budget, see UpsGeneric.budget()) and when the event loop stops
+    waiting for it first. Then the Result is yielded right away. The worker
+    thread handling the device can not be interrupted, so the device keeps its
+    concurrency slot until the thread is done; with the budget spent it stops
+    making requests soon after.
+
+    :param devices: iterable of Device or (driver, host, user, password[, kwargs]) tuples
+    :param operation: name of the driver method or a callable taking the ups object as first argument
+    :param concurrency: maximum number of devices handled at once
+    :param vendor_concurrency: dict of vendor name (see UpsGeneric.vendor) -> maximum number of its devices handled at once
+    :param timeout: seconds allowed for login, operation and logout on a single host
+    :param executor: concurrent.futures executor to run drivers in; by default one with `concurrency` threads is used
+    :param driver_kwargs: passed to driver's constructor, eg. adapter
+    """
+    loop = asyncio.get_event_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+    limit = asyncio.Semaphore(concurrency)
+    vendor_limits = {}
+    for vendor, n in (vendor_concurrency or {}).items():
+        vendor_limits[vendor] = asyncio.Semaphore(n)
+
+    async def handle(device):
+        vendor_limit = vendor_limits.get(vendor_of(device.driver))
+        if vendor_limit is not None:
+            await vendor_limit.acquire()
+        await limit.acquire()
+
+        def release(done=None):
+            if done is not None and not done.cancelled():
+                # nobody waits for a timed out job any more, its error would be logged
+                done.exception()
+            limit.release()
+            if vendor_limit is not None:
+                vendor_limit.release()
+
+        start = time.time()
+        job = loop.run_in_executor(executor, lambda: run_device(device, operation, args, kwargs, timeout, **driver_kwargs))
+        try:
+            value = await asyncio.wait_for(asyncio.shield(job), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # the worker thread can not be interrupted, keep its slot until it is done
+            job.add_done_callback(release)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            error = DeviceTimeout('%s: no result in %s seconds' % (device.host, timeout))
+            return Result(device, operation, None, error, time.time() - start)
+        except Exception as e:
+            release()
+            return Result(device, operation, None, e, time.time() - start)
+        release()
+        return Result(device, operation, value, None, time.time() - start)
+
+    tasks = [asyncio.ensure_future(handle(as_device(device))) for device in devices]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        if own_executor:
+            executor.shutdown(wait=False)
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Command line interface: runs an operation on every device of an inventory
+and writes one JSON line per device as soon as it is done.
+
+```
+upsconfer info devices.csv --workers 50 > info.jsonl
+upsconfer set-trap devices.jsonl --config trap.json --dry-run
+```
+
+The inventory is a CSV file with a header row, or JSON lines (one object per
+line), with columns `host` and optionally `driver`, `user` and `password`.
+`driver` is a driver class name (eg. UpsSocomecNetys); devices without one
+get the driver --fingerprints remembers for their host, or are detected (see
+upsconfer.detection) when they are handled. Vendor limits only apply to
+devices whose driver is known before they are handled. Missing credentials
+are taken from --user and --password or UPSCONFER_USER and
+UPSCONFER_PASSWORD environment variables.
+"""
+
+from __future__ import print_function
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from upsconfer import fleet, registry
+from upsconfer.detection import FingerprintCache, detect
+from upsconfer.reconcile import apply_config, config_to_str
+
+# operation -> function(ups, options) returning something JSON serializable
+OPERATIONS = {
+    'info': lambda ups, options: ups.get_info(),
+    'snmp': lambda ups, options: ups.get_snmp_config(),
+    'trap': lambda ups, options: ups.get_trap_config(),
+    'set-snmp': lambda ups, options: apply_config(ups, {'snmp': options.config}, options.dry_run)['snmp'].to_dict(),
+    'set-trap': lambda ups, options: apply_config(ups, {'trap': options.config}, options.dry_run)['trap'].to_dict(),
+    'reboot': lambda ups, options: ups.reboot(),
+}
+
+
+def read_inventory(f, format=None):
+    """
+    :param f: file opened in text mode
+    :param format: csv or jsonl, guessed from the file name by default
+    :return: generator of dicts with host, driver, user and password keys; broken rows have an error key instead
+    """
+    if format is None:
+        format = 'csv' if getattr(f, 'name', '').endswith('.csv') else 'jsonl'
+    if format == 'csv':
+        rows = csv.DictReader(f)
+    else:
+        rows = (line for line in f if line.strip())
+    for n, row in enumerate(rows, 1):
+        if format != 'csv':
+            try:
+                row = json.loads(row)
+            except ValueError as e:
+                yield {'error': 'Inventory row %d is not valid JSON: %s' % (n, e)}
+                continue
+        row = dict((k.strip().lower(), ('%s' % (v or '')).strip()) for k, v in row.items() if k)
+        if not row.get('host'):
+            row = {'error': 'Inventory row %d has no host' % n}
+        yield row
+
+
+def failing_driver(message):
+    """
+    :return: function that is called like a driver class and raises ValueError, so the device gets a failed result
+    """
+    def driver(host, user, password, **kwargs):
+        raise ValueError(message)
+    return driver
+
+
+def detecting_driver(cache=None):
+    """
+    :return: function that is called like a driver class and returns an object of the detected class
+    """
+    def detected(host, user, password, **kwargs):
+        return detect(host, user, password, cache=cache, **kwargs)
+    return detected
+
+
+def devices(rows, user=None, password=None, cache=None, undetected=None):
+    """
+    Rows without a driver get the driver cache remembers for their host, so it
+    is known (eg. for vendor limits) before the device is handled. Other rows
+    get one that detects the driver when the device is handled.
+
+    :param undetected: function called with the host of every device whose driver is not known yet
+    :return: generator of upsconfer.fleet.Device for inventory rows
+    """
+    detected = detecting_driver(cache)
+    for row in rows:
+        name = row.get('driver')
+        if not name and 'error' not in row and cache is not None:
+            name = cache.lookup(row['host'])
+            if name not in registry.names():
+                name = None
+        if 'error' in row:
+            driver = failing_driver(row['error'])
+        elif not name:
+            driver = detected
+            if undetected is not None:
+                undetected(row['host'])
+        else:
+            try:
+                driver = registry.get(name)
+            except KeyError as e:
+                driver = failing_driver(e.args[0])
+        yield fleet.Device(driver, row.get('host'), row.get('user') or user, row.get('password') or password)
+
+
+def _error(error):
+    return '%s: %s' % (type(error).__name__, error)
+
+
+def record(result, operation):
+    """
+    :param result: upsconfer.fleet.Result, its value is a (driver name, operation result) tuple
+    :return: dict written to output
+    """
+    out = {'host': result.device.host, 'operation': operation, 'elapsed': round(result.elapsed, 3)}
+    if result.error is not None:
+        driver = result.device.driver
+        out['driver'] = driver.__name__ if isinstance(driver, type) else None
+        out['error'] = _error(result.error)
+    else:
+        out['driver'], out['value'] = result.value
+    return out
+
+
+def _vendor_limit(value):
+    vendor, sep, n = value.partition('=')
+    if not sep or not n.isdigit() or int(n) < 1:
+        raise argparse.ArgumentTypeError('expected VENDOR=N, eg. riello=5')
+    return vendor, int(n)
+
+
+def _open_inventory(path):
+    if path == '-':
+        return sys.stdin
+    if sys.version_info[0] < 3:
+        return open(path, 'rb')
+    return io.open(path, encoding='utf-8', newline='')
+
+
+def parser():
+    p = argparse.ArgumentParser(prog='upsconfer', description='Run an operation on UPS devices from an inventory '
+                                'and write results as JSON lines.')
+    p.add_argument('operation', choices=sorted(OPERATIONS))
+    p.add_argument('inventory', help='CSV or JSON lines file with host[, driver, user, password], - for stdin')
+    p.add_argument('--format', choices=['csv', 'jsonl'], help='inventory format, guessed from file name by default')
+    p.add_argument('--user', default=os.environ.get('UPSCONFER_USER'), help='default user (UPSCONFER_USER)')
+    p.add_argument('--password', default=os.environ.get('UPSCONFER_PASSWORD'),
+                   help='default password (UPSCONFER_PASSWORD)')
+    p.add_argument('--config', help='JSON file with config for set-snmp and set-trap, '
+                   'in the format of get_snmp_config() or get_trap_config()')
+    p.add_argument('--dry-run', action='store_true', help='only report what set-snmp or set-trap would change')
+    p.add_argument('-w', '--workers', type=int, default=10, help='devices handled at once')
+    p.add_argument('--vendor-concurrency', type=_vendor_limit, action='append', default=[], metavar='VENDOR=N',
+                   help='limit devices of a vendor handled at once, may be repeated')
+    p.add_argument('--budget', type=float, help='seconds allowed for each device')
+    p.add_argument('--fingerprints', help='FingerprintCache file for detected drivers')
+    p.add_argument('-o', '--output', help='write results to this file instead of stdout')
+    return p
+
+
+def main(argv=None):
+    """
+    Entry point of the upsconfer command.
+
+    :return: exit status, 1 if any device (or inventory row) failed
+    """
+    options = parser().parse_args(argv)
+    if options.operation.startswith('set-'):
+        if not options.config:
+            parser().error('%s needs --config' % options.operation)
+        with open(options.config) as f:
+            options.config = json.load(f)
+        if not isinstance(options.config, dict):
+            parser().error('--config must hold a JSON object of entries')
+        options.config = config_to_str(options.config)
+    elif options.config or options.dry_run:
+        parser().error('--config and --dry-run are only used by set-snmp and set-trap')
+
+    cache = FingerprintCache(options.fingerprints) if options.fingerprints else None
+    operation = OPERATIONS[options.operation]
+
+    def run_operation(ups):
+        return type(ups).__name__, operation(ups, options)
+
+    warned = []
+
+    def undetected(host):
+        # the vendor of a device is not known before it is detected
+        if options.vendor_concurrency and not warned:
+            warned.append(host)
+            print('upsconfer: --vendor-concurrency does not apply to devices without a driver that '
+                  '--fingerprints does not know, eg. %s' % host, file=sys.stderr)
+
+    inventory = _open_inventory(options.inventory)
+    out = open(options.output, 'w') if options.output else sys.stdout
+    failed = 0
+    try:
+        rows = read_inventory(inventory, options.format)
+        results = fleet.run(devices(rows, options.user, options.password, cache, undetected), run_operation,
+                            workers=options.workers, budget=options.budget,
+                            vendor_concurrency=dict(options.vendor_concurrency))
+        for result in results:
+            if result.error is not None:
+                failed += 1
+            out.write(json.dumps(record(result, options.operation), sort_keys=True) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if inventory is not sys.stdin:
+            inventory.close()
+        if cache is not None:
+            cache.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Detecting which driver to use for a device.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from upsconfer import registry
+from upsconfer.exceptions import DetectionFailure
+from upsconfer.util import makedirs, write_json
+
+
+class FingerprintCache(object):
+    """
+    Remembers which driver each device needs, in a JSON file, by host and by
+    MAC address (when known, eg. from get_info()).
+
+    Changes are kept in memory until flush() (or close(), or the end of a
+    `with` block), which replaces the file atomically. Concurrent processes
+    will not corrupt it, but one may overwrite entries added by another in
+    the meantime; that only costs probing those devices again. Thread safe.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hosts = {}
+        self.macs = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self.reload()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def reload(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            data = {}
+        with self._lock:
+            self.hosts = data.get('hosts', {})
+            self.macs = data.get('macs', {})
+            self.dirty = False
+
+    def lookup(self, host=None, mac=None):
+        """
+        :return: name of the driver or None if device is not known
+        """
+        if mac and self._mac(mac) in self.macs:
+            return self.macs[self._mac(mac)]['driver']
+        if host in self.hosts:
+            return self.hosts[host]['driver']
+        return None
+
+    def remember(self, host, driver, mac=None, model=None):
+        """
+        :param driver: driver class or its name
+        """
+        driver = getattr(driver, '__name__', driver)
+        entry = {'driver': driver, 'seen': time.time()}
+        if model:
+            entry['model'] = model
+        with self._lock:
+            if mac:
+                entry['mac'] = self._mac(mac)
+                self.macs[self._mac(mac)] = dict(entry, host=host)
+            self.hosts[host] = entry
+            self.dirty = True
+
+    def remember_info(self, ups, info):
+        """
+        Records device's driver, MAC address and model from get_info() output.
+        """
+        self.remember(ups.host, type(ups), mac=info.get('mac_address'), model=info.get('model'))
+
+    def forget(self, host):
+        with self._lock:
+            entry = self.hosts.pop(host, None)
+            if entry and entry.get('mac'):
+                self.macs.pop(entry['mac'], None)
+            self.dirty = True
+
+    def flush(self):
+        """
+        Writes the file, if anything changed since it was read or written.
+        """
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {'hosts': dict(self.hosts), 'macs': dict(self.macs)}
+            self.dirty = False
+        try:
+            self._write(data)
+        except Exception:
+            self.dirty = True
+            raise
+
+    close = flush
+
+    @staticmethod
+    def _mac(mac):
+        return re.sub(r'[^0-9a-f]', '', mac.lower())
+
+    def _write(self, data):
+        makedirs(os.path.dirname(os.path.abspath(self.path)))
+        write_json(self.path, data)
+
+
+def probe(host, session=None, timeout=10):
+    """
+    Finds the driver for a device with as few unauthenticated requests as
+    possible. Usually a single request to `http://host/` is enough:
+
+    * Netys login page has a `Challenge` field,
+    * Masterys asks for http basic auth,
+    * Riello Netman 204 login page posts to `cgi-bin/login.cgi`; if `http://host/` is not
+      conclusive, `https://host/cgi-bin/login.cgi` is checked.
+
+    :return: driver class
+    :raises DetectionFailure: if device type can not be recognized
+    """
+    # imported here, so that `import upsconfer` stays cheap
+    import requests
+    if session is None:
+        session = requests.Session()
+        try:
+            return probe(host, session, timeout)
+        finally:
+            session.close()
+    try:
+        response = session.get('http://%s/' % host, timeout=timeout, verify=False)
+        if response.status_code == 401 and 'basic' in response.headers.get('WWW-Authenticate', '').lower():
+            return registry.get('UpsSocomecMasterys')
+        if re.search(r'name="?Challenge', response.text, re.I):
+            return registry.get('UpsSocomecNetys')
+        if 'login.cgi' in response.text or 'Netman' in response.text:
+            return registry.get('UpsRielloSentinel')
+    except requests.RequestException:
+        pass
+    try:
+        response = session.get('https://%s/cgi-bin/login.cgi' % host, timeout=timeout, verify=False)
+        if response.ok and 'login.cgi' in response.text:
+            return registry.get('UpsRielloSentinel')
+    except requests.RequestException as e:
+        raise DetectionFailure('Could not detect device type of %s: %s' % (host, e))
+    raise DetectionFailure('Could not detect device type of %s' % host)
+
+
+def detect_driver(host, mac=None, cache=None, session=None, timeout=10):
+    """
+    Returns driver class for host, from cache when possible, probing the
+    device otherwise. Probe results are stored in cache.
+
+    :param cache: optional FingerprintCache
+    """
+    if cache is not None:
+        name = cache.lookup(host, mac)
+        if name in registry.names():
+            return registry.get(name)
+    driver = probe(host, session=session, timeout=timeout)
+    if cache is not None:
+        cache.remember(host, driver, mac=mac)
+    return driver
+
+
+def detect(host, user=None, password=None, mac=None, cache=None, timeout=10, **kwargs):
+    """
+    Returns a ups object of the right type for host.
+
+    ```
+    ups = upsconfer.detect('myups.example.com', 'admin', 'mypass', cache=FingerprintCache('fingerprints.json'))
+    ```
+
+    :param mac: MAC address of the device, if known, for cache lookups
+    :param cache: optional FingerprintCache, known devices are not probed
+    :param timeout: seconds to wait for each probe
+    :param kwargs: passed to the driver's constructor, eg. adapter
+    :raises DetectionFailure: if device type can not be recognized
+    """
+    session = None
+    if kwargs.get('adapter') is not None:
+        import requests
+        session = requests.Session()
+        session.adapters.clear()
+        session.mount('http://', kwargs['adapter'])
+        session.mount('https://', kwargs['adapter'])
+    driver = detect_driver(host, mac=mac, cache=cache, session=session, timeout=timeout)
+    return driver(host, user, password, **kwargs)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Comparing configurations and reporting changes made by setters.
+"""
+
+
+def diff_config(current, new_config):
+    """
+    Compares new_config with current config (both in the format returned by
+    get_snmp_config() or get_trap_config()).
+
+    Only keys present in the current entry are compared, so keys that are not
+    supported by the device are ignored. Values are compared as strings
+    (version `2` equals `'2'`).
+
+    :return: sorted list of (entry, key, old, new) tuples for values that differ
+    """
+    changes = []
+    for entry in sorted(new_config):
+        old_entry = current.get(entry)
+        new_entry = new_config[entry] or {}
+        for key in sorted(new_entry):
+            if old_entry is not None and key not in old_entry:
+                continue
+            old = old_entry.get(key) if old_entry is not None else None
+            new = new_entry[key]
+            if old is None or '%s' % old != '%s' % new:
+                changes.append((entry, key, old, new))
+    return changes
+
+
+def diff_fields(current, new):
+    """
+    Compares two dicts of form fields.
+
+    :return: dict of field -> (old, new) for fields that differ
+    """
+    fields = {}
+    for name, value in new.items():
+        if current.get(name) != value:
+            fields[name] = (current.get(name), value)
+    return fields
+
+
+class ChangeReport(object):
+    """
+    Returned by set_snmp_config() and set_trap_config().
+
+    * `section` is `snmp` or `trap`
+    * `changes` is a list of (entry, key, old, new) tuples of config values that differ from device's current config
+    * `fields` is a dict of form field -> (old, new) for submitted form values that differ
+    * `dry_run` is True if changes were only computed, not applied
+    * `applied` is True if the form was submitted to the device
+    """
+
+    def __init__(self, section, changes, fields, dry_run=False, applied=False):
+        self.section = section
+        self.changes = changes
+        self.fields = fields
+        self.dry_run = dry_run
+        self.applied = applied
+
+    @property
+    def changed(self):
+        """
+        True if the device config differs (or differed before applying) from the requested one.
+        """
+        return bool(self.fields)
+
+    def to_dict(self):
+        return {
+            'section': self.section,
+            'changes': [list(c) for c in self.changes],
+            'changed': self.changed,
+            'dry_run': self.dry_run,
+            'applied': self.applied,
+        }
+
+    def __repr__(self):
+        return '<ChangeReport %s changed=%s applied=%s dry_run=%s changes=%r>' % (
+            self.section, self.changed, self.applied, self.dry_run, self.changes)
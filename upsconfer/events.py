@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Incremental reading of paginated device event logs.
+"""
+
+
+class EventReader(object):
+    """
+    Iterator over events of a device event log, newest first. Pages are
+    downloaded only when iteration reaches them and iteration stops at the
+    first event that was already returned when `since` cursor was taken.
+
+    Events are dicts with at least `time` (as shown by the device) and `event`
+    keys. `cursor` is a JSON serializable value marking events returned so
+    far; pass it as `since` on next run to get only events not returned yet.
+    It is updated with every returned event, so when iteration stops early
+    the next run also returns the older events it did not reach.
+
+    The cursor lists blocks of returned events, newest first, as pairs of the
+    keys of block's newest WINDOW events and its number of events (None when
+    the block reaches the end of the log). Device clocks can repeat timestamps
+    (eg. after a restart), so all WINDOW keys have to match.
+    """
+    WINDOW = 3
+
+    def __init__(self, pages, since=None):
+        """
+        :param pages: iterable of lists of events, newest page (and event) first
+        :param since: cursor from a previous EventReader
+        """
+        self._pages = iter(pages)
+        self._buffer = []
+        self._exhausted = False
+        # blocks of since not reached yet
+        self._pending = [[[list(k) for k in keys], count] for keys, count in since or []]
+        # block of events returned or skipped by this reader
+        self._keys = []
+        self._count = 0
+
+    def __iter__(self):
+        return self
+
+    @property
+    def cursor(self):
+        blocks = [[keys, count] for keys, count in self._pending]
+        if self._keys:
+            blocks.insert(0, [list(self._keys), self._count])
+        return blocks
+
+    def _fill(self, n):
+        while len(self._buffer) < n and not self._exhausted:
+            try:
+                self._buffer.extend(next(self._pages))
+            except StopIteration:
+                self._exhausted = True
+
+    @staticmethod
+    def _key(event):
+        return [event['time'], event['event']]
+
+    def _take(self):
+        event = self._buffer.pop(0)
+        if len(self._keys) < self.WINDOW:
+            self._keys.append(self._key(event))
+        self._count += 1
+        return event
+
+    def _at(self, keys):
+        self._fill(len(keys))
+        head = [self._key(e) for e in self._buffer[:len(keys)]]
+        # near the end of the log fewer events than the cursor holds may remain
+        return bool(head) and head == keys[:len(head)]
+
+    def _stop(self, keys=None):
+        # everything from here to the end of the log has been returned
+        if not self._keys:
+            self._keys = keys or []
+        self._count = None
+        self._pending = []
+        self._buffer = []
+        self._exhausted = True
+        raise StopIteration()
+
+    def __next__(self):
+        if self._count is None:
+            raise StopIteration()
+        while True:
+            self._fill(1)
+            if not self._buffer:
+                self._stop()
+            if not self._pending or not self._at(self._pending[0][0]):
+                return self._take()
+            keys, count = self._pending.pop(0)
+            if count is None:
+                self._stop(keys)
+            for _ in range(count):
+                self._fill(1)
+                if not self._buffer:
+                    break
+                self._take()
+
+    next = __next__
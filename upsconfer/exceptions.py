@@ -27,3 +27,11 @@ class LoginFailure(Exception):
 
 class SerialNotFound(Exception):
     pass
+
+
+class DetectionFailure(Exception):
+    pass
+
+
+class DeviceTimeout(Exception):
+    pass
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Running operations on many devices in a pool of worker threads.
+
+```
+devices = [(UpsSocomecNetys, 'ups1.example.com', 'admin', 'pass'), ...]
+for result in run(devices, 'get_info', workers=20):
+    print(result.device.host, result.value or result.error)
+```
+"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# driver is a UpsGeneric subclass (or a function called like one, eg. to detect the class),
+# kwargs are extra arguments for its constructor (may be None)
+Device = namedtuple('Device', 'driver host user password kwargs')
+Device.__new__.__defaults__ = (None,)
+
+# exactly one of value and error is set; elapsed is wall time in seconds
+Result = namedtuple('Result', 'device operation value error elapsed')
+
+
+def as_device(device):
+    """
+    Accepts a Device or a plain (driver, host, user, password[, kwargs]) tuple.
+    """
+    if isinstance(device, Device):
+        return device
+    return Device(*device)
+
+
+def vendor_of(driver):
+    return getattr(driver, 'vendor', None) or driver.__name__
+
+
+def run_device(device, operation, args=(), kwargs=None, budget=None, **driver_kwargs):
+    """
+    Logs into device, runs operation and logs out again. logout() is always
+    called, even if login or the operation fails, because some devices allow
+    only one management session at a time. Errors from logout() are ignored:
+    a failed operation keeps its own error and a successful one its value
+    (eg. reboot(), after which the device does not answer any more).
+
+    :param operation: name of the driver method or a callable taking the ups object as first argument
+    :param budget: seconds allowed for login and operation (see UpsGeneric.budget()), logout is not limited
+    :return: whatever operation returned
+    """
+    init_kwargs = dict(driver_kwargs)
+    init_kwargs.update(device.kwargs or {})
+    ups = device.driver(device.host, device.user, device.password, **init_kwargs)
+    try:
+        with ups.budget(budget):
+            ups.login()
+            if callable(operation):
+                return operation(ups, *args, **(kwargs or {}))
+            return getattr(ups, operation)(*args, **(kwargs or {}))
+    finally:
+        try:
+            ups.logout()
+        except Exception:
+            pass
+
+
+def run_result(device, operation, args=(), kwargs=None, budget=None, **driver_kwargs):
+    """
+    Same as run_device() but returns a Result instead of raising errors.
+    """
+    start = time.time()
+    try:
+        value = run_device(device, operation, args, kwargs, budget, **driver_kwargs)
+    except Exception as e:
+        return Result(device, operation, None, e, time.time() - start)
+    return Result(device, operation, value, None, time.time() - start)
+
+
+def run(devices, operation, args=(), kwargs=None, workers=10, budget=None, vendor_concurrency=None, **driver_kwargs):
+    """
+    Runs operation on all devices using a pool of worker threads. Returns a
+    generator that yields a Result for each device as soon as it completes.
+
+    Devices are consumed lazily and at most 2 * workers of them are queued at
+    once, so devices can be a generator over an inventory of any size.
+    Devices of a vendor that is at its vendor_concurrency limit are held back
+    (up to 2 * workers of them) while devices of other vendors go ahead.
+
+    :param devices: iterable of Device or (driver, host, user, password[, kwargs]) tuples
+    :param operation: name of the driver method (eg. 'get_info', 'set_trap_config') or a callable taking the ups object as first argument
+    :param args: positional arguments for the operation
+    :param kwargs: keyword arguments for the operation
+    :param workers: number of devices handled at once
+    :param budget: seconds allowed for login and operation on each device, see run_device()
+    :param vendor_concurrency: dict of vendor name (see UpsGeneric.vendor) -> maximum number of its devices handled at once
+    :param driver_kwargs: passed to driver's constructor, eg. adapter
+    """
+    limits = dict(vendor_concurrency or {})
+    for vendor, n in limits.items():
+        if n < 1:
+            raise ValueError('vendor_concurrency of %s must be at least 1' % vendor)
+    devices = iter(devices)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    # future -> vendor
+    pending = {}
+    # vendor -> number of its devices in pending
+    active = {}
+    held = []
+
+    def has_room(vendor):
+        return vendor not in limits or active.get(vendor, 0) < limits[vendor]
+
+    def submit(device, vendor):
+        active[vendor] = active.get(vendor, 0) + 1
+        pending[executor.submit(run_result, device, operation, args, kwargs, budget, **driver_kwargs)] = vendor
+
+    def fill():
+        for device, vendor in list(held):
+            if len(pending) >= 2 * workers:
+                return
+            if has_room(vendor):
+                held.remove((device, vendor))
+                submit(device, vendor)
+        while len(pending) < 2 * workers and len(held) < 2 * workers:
+            try:
+                device = as_device(next(devices))
+            except StopIteration:
+                return
+            vendor = vendor_of(device.driver)
+            if has_room(vendor):
+                submit(device, vendor)
+            else:
+                held.append((device, vendor))
+
+    try:
+        fill()
+        while pending:
+            done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                active[pending.pop(future)] -= 1
+            for future in done:
+                yield future.result()
+            fill()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
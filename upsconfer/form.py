@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Reading values of form fields and labelled table cells from html pages.
+"""
+
+from lxml import etree
+
+
+class FormExtractor(object):
+    """
+    Walks all named `<input>`, `<select>` and `<textarea>` elements of a page
+    once and returns their current values as a `name -> value` dict.
+
+    * inputs without a value attribute have value `''`
+    * checkboxes and radio buttons are included only when checked (`'on'` if they have no value)
+    * selects have the value of the selected option or `None` if no option is selected
+    * if a name appears more than once, the first field wins
+    """
+    XP_FIELDS = etree.XPath('//input[@name] | //select[@name] | //textarea[@name]')
+    XP_SELECTED = etree.XPath('(.//option[@selected])[1]')
+
+    @classmethod
+    def extract(cls, html):
+        """
+        :param html: parsed lxml.html document
+        :return: dict
+        """
+        fields = {}
+        for el in cls.XP_FIELDS(html):
+            name = el.get('name')
+            if name in fields:
+                continue
+            if el.tag == 'select':
+                selected = cls.XP_SELECTED(el)
+                if selected:
+                    value = selected[0].get('value')
+                    if value is None:
+                        value = (selected[0].text or '').strip()
+                else:
+                    value = None
+            elif el.tag == 'textarea':
+                value = el.text or ''
+            elif el.get('type', '').lower() in ('checkbox', 'radio'):
+                if el.get('checked') is None:
+                    continue
+                value = el.get('value', 'on')
+            else:
+                value = el.get('value', '')
+            fields[name] = value
+        return fields
+
+
+class TableExtractor(object):
+    """
+    Reads `label -> value` pairs from tables where a cell with a label
+    (eg. `Model:`) is followed by a cell with its value. All cells of the page
+    are walked once.
+
+    Labels and values have their whitespace normalized. If a label appears
+    more than once, the first value wins.
+    """
+    XP_CELLS = etree.XPath('//td[following-sibling::td]')
+    XP_NEXT = etree.XPath('following-sibling::td[1]')
+
+    @classmethod
+    def extract(cls, html):
+        """
+        :param html: parsed lxml.html document
+        :return: dict
+        """
+        values = {}
+        for td in cls.XP_CELLS(html):
+            label = ' '.join(td.text_content().split())
+            if not label or label in values:
+                continue
+            values[label] = ' '.join(cls.XP_NEXT(td)[0].text_content().split())
+        return values
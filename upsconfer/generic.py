@@ -24,15 +24,166 @@
 Generic class that vendor specific classes should inherit from.
 """
 
-from upsconfer.exceptions import SerialNotFound
+import random
+import threading
+import time
+from contextlib import contextmanager
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import urlparse
+from upsconfer.diff import ChangeReport, diff_fields
+from upsconfer.exceptions import DeviceTimeout, SerialNotFound
+from upsconfer.form import FormExtractor, TableExtractor
+from upsconfer.pages import PageStore
+
+_clock = getattr(time, 'perf_counter', time.time)
+_local = threading.local()
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def shared_pool(hosts=100, per_host=1):
+    """
+    Returns a connection pool (requests transport adapter) that can be passed
+    as `adapter` to many device objects at once, eg. when running over a whole
+    fleet of devices. Pool is closed by the caller, not by device's logout().
+
+    :param hosts: number of per-host pools to keep around
+    :param per_host: number of keep-alive connections kept to each host
+    :return: requests.adapters.HTTPAdapter
+    """
+    return HTTPAdapter(pool_connections=hosts, pool_maxsize=per_host)
+
+
+def _html_parser():
+    """
+    HTML parser of the current thread. lxml serializes threads that share a
+    parser, so each thread gets its own and reuses it for all pages.
+    """
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = lxml.html.HTMLParser()
+    return parser
 
 
 class UpsGeneric(object):
-    def __init__(self, host, user, password):
+    # name used to group devices of the same make, eg. for per-vendor limits
+    vendor = None
+    # all requests go to base_url % host + path
+    base_url = 'http://%s'
+    # verify TLS certificate of the management card
+    verify = True
+    # size of connection pool when device owns its adapter
+    pool_connections = 1
+    pool_maxsize = 1
+    # form action -> page the form is rendered on; posting a form drops that page from cache
+    FORM_PAGES = {}
+    # path -> (start, end) markers around the part of a page drivers read, only that part
+    # is parsed; None key applies to pages not listed. Whole page is parsed if a marker is missing.
+    FRAGMENTS = {}
+    # set to False to always parse whole pages
+    parse_fragments = True
+    # get_all() section -> getter
+    SECTIONS = {
+        'info': 'get_info',
+        'snmp': 'get_snmp_config',
+        'trap': 'get_trap_config',
+    }
+    # sections read by get_all() by default
+    DEFAULT_SECTIONS = ('info', 'snmp', 'trap')
+    # seconds to wait for a connection to the device and for each read from it
+    connect_timeout = 10
+    read_timeout = 30
+    # GET requests are retried this many times after connection errors and timeouts,
+    # sleeping a random time up to retry_backoff * 2 ** n seconds before retry n
+    retries = 2
+    retry_backoff = 0.5
+    # errors that are not worth retrying, eg. a bad certificate
+    NO_RETRY = (requests.exceptions.SSLError, requests.exceptions.ProxyError)
+    # GET requests that act on the device (eg. reboot) and must not be sent twice
+    NO_RETRY_PATHS = frozenset()
+    # keep page hashes and results of @tracked getters when no page_store is given
+    track_pages = True
+
+    def __init__(self, host, user, password, adapter=None, session_store=None, hooks=None, page_store=None,
+                 typed=False):
+        """
+        :param adapter: optional shared requests transport adapter (see shared_pool() and upsconfer.transport). By default each device gets its own keep-alive connection pool.
+        :param session_store: optional upsconfer.sessions.SessionStore; login() then reuses a saved session instead of logging in again.
+        :param hooks: optional list of callables called with (event, labels, seconds) for every HTTP request and HTML parse (see upsconfer.metrics).
+        :param page_store: optional upsconfer.pages.PageStore shared by many devices. By default each device keeps its own (see track_pages).
+        :param typed: getters return records of upsconfer.records instead of dicts of strings
+        """
         self.host = host
         self.user = user
         self.password = password
-        self.cookies = None
+        self.auth = None
+        self.adapter = adapter
+        self._session = None
+        self._pages = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.session_store = session_store
+        self._resumed = False
+        self.hooks = list(hooks or [])
+        self.deadline = None
+        if page_store is None and self.track_pages:
+            page_store = PageStore()
+        self.page_store = page_store
+        self.typed = typed
+        # url -> content hash of pages downloaded in this session
+        self._hashes = {}
+        # url -> text of pages downloaded to check their hash, but not parsed yet
+        self._texts = {}
+        # dicts of path -> hash of pages read by @tracked getters that are running
+        self._reading = []
+
+    @property
+    def session(self):
+        """
+        requests.Session used for all requests to the device. It keeps
+        connections alive between requests and stores cookies. Created on first
+        use and discarded by close().
+        """
+        if self._session is None:
+            session = requests.Session()
+            session.verify = self.verify
+            adapter = self.adapter
+            if adapter is None:
+                adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                      pool_maxsize=self.pool_maxsize)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            # transports that do not use the network (upsconfer.transport.ReplayAdapter)
+            # skip looking up proxies and netrc in the environment on every request
+            session.trust_env = getattr(adapter, 'trust_env', True)
+            self._session = session
+        return self._session
+
+    @property
+    def cookies(self):
+        return self.session.cookies
+
+    def close(self):
+        """
+        Closes the HTTP session and drops its cookies and cached pages.
+        Connections of a shared adapter are left open for other devices.
+        """
+        self.clear_cache()
+        if self._session is None:
+            return
+        if self.adapter is not None:
+            self._session.adapters.clear()
+        self._session.close()
+        self._session = None
+
+    def clear_cache(self):
+        """
+        Forget all pages downloaded in this session.
+        """
+        self._pages.clear()
+        self._hashes.clear()
+        self._texts.clear()
 
     def login(self):
         raise NotImplementedError()
@@ -72,14 +223,16 @@ class UpsGeneric(object):
         """
         raise NotImplementedError()
 
-    def set_snmp_config(self, new_config):
+    def set_snmp_config(self, new_config, dry_run=False):
         """
         Sets SNMP configuration from new_config dict.
 
         Optional keys that are not supported by this device type are silently ignored.
+        The form is submitted only if new_config differs from device's current configuration.
 
         :param new_config: configuration that will be applied to the device. Uses the same structure as returned by get_snmp_config().
-        :return: bool
+        :param dry_run: only compute changes, do not submit them
+        :return: upsconfer.diff.ChangeReport
         """
         raise NotImplementedError()
 
@@ -110,16 +263,40 @@ class UpsGeneric(object):
         """
         raise NotImplementedError()
 
-    def set_trap_config(self, new_config):
+    def set_trap_config(self, new_config, dry_run=False):
         """
         Sets SNMP trap configuration from new_config dict.
 
         Optional keys that are not supported by this device type are silently ignored.
+        The form is submitted only if new_config differs from device's current configuration.
+
         :param new_config: configuration that will be applied to the device. Uses the same structure as returned by get_trap_config().
-        :return: bool
+        :param dry_run: only compute changes, do not submit them
+        :return: upsconfer.diff.ChangeReport
         """
         raise NotImplementedError()
 
+    def update(self, snmp=None, trap=None, dry_run=False):
+        """
+        Sets SNMP and/or trap configuration in one call.
+
+        Drivers of devices that have both on the same form (Riello) read the
+        form once and submit all changes with a single POST, so neither
+        change can overwrite the other. Elsewhere set_snmp_config() and
+        set_trap_config() are called in turn.
+
+        :param snmp: new SNMP configuration, as for set_snmp_config(); None to leave it as it is
+        :param trap: new trap configuration, as for set_trap_config(); None to leave it as it is
+        :param dry_run: only compute changes, do not submit them
+        :return: dict of section (`snmp`, `trap`) -> upsconfer.diff.ChangeReport, for given sections
+        """
+        reports = {}
+        if snmp is not None:
+            reports['snmp'] = self.set_snmp_config(snmp, dry_run=dry_run)
+        if trap is not None:
+            reports['trap'] = self.set_trap_config(trap, dry_run=dry_run)
+        return reports
+
     def get_serial(self):
         """
         :return: device serial number as a string
@@ -152,5 +329,421 @@ class UpsGeneric(object):
         """
         raise NotImplementedError()
 
+    def get_status(self):
+        """
+        Returns current readings from the device. Numeric readings are ints or
+        floats, readings the device does not report are None.
+        ```
+        {
+            'input_voltage': 229.0,
+            'input_frequency': 50.0,
+            'output_voltage': 230.0,
+            'output_frequency': 50.0,
+            'output_current': 0.0,
+            'output_source': 'Normal',
+            'load': 0,
+            'bypass_voltage': 229.0,
+            'bypass_frequency': 50.0,
+            'battery_status': 'Charging',
+            'battery_charge': 100,
+            'battery_voltage': 55.3,
+            'battery_temperature': 31.0,
+            'on_battery_time': 0,
+            'runtime': None,
+            'alarms': [],
+            'states': ['Load On Inverter'],
+        }
+        ```
+
+        * `load` and `battery_charge` are in percent.
+        * `on_battery_time` and `runtime` (estimated remaining battery time) are in seconds.
+        * `alarms` lists active alarm indicators, `states` lists other active status indicators.
+
+        :return: dict
+        """
+        raise NotImplementedError()
+
+    def poll_status(self, interval=10, count=None):
+        """
+        Reads status every interval seconds and yields only readings that
+        changed since the previous poll (an empty dict if nothing changed).
+        First poll yields all readings.
+
+        :param interval: seconds between polls
+        :param count: stop after this many polls, poll forever if None
+        :return: generator of dicts with a subset of get_status() keys
+        """
+        last = {}
+        n = 0
+        while count is None or n < count:
+            if n:
+                time.sleep(interval)
+            status = self.get_status()
+            delta = dict((k, v) for k, v in status.items() if k not in last or last[k] != v)
+            last = status
+            n += 1
+            yield delta
+
+    def iter_events(self, since=None):
+        """
+        Returns an iterator over device's event log, newest event first.
+        ```
+        {
+            'time': '12/13/2016 14:03:19',
+            'timestamp': datetime.datetime(2016, 12, 13, 14, 3, 19),
+            'event': 'System startup',
+        }
+        ```
+
+        Log pages are downloaded only as iteration reaches them and iteration
+        stops at events already seen when `since` cursor was taken. Iterator's
+        `cursor` attribute holds a JSON serializable cursor for the next call,
+        updated with every event returned.
+
+        :param since: cursor from a previous call
+        :return: upsconfer.events.EventReader
+        """
+        raise NotImplementedError()
+
+    def get_all(self, sections=None):
+        """
+        Returns results of several getters at once:
+        ```
+        {
+            'info': {...},  # get_info()
+            'snmp': {...},  # get_snmp_config()
+            'trap': {...},  # get_trap_config()
+        }
+        ```
+
+        Pages are cached for the session, so a page read by more than one
+        section (eg. SNMP and trap config on Riello) is downloaded and parsed
+        only once.
+
+        :param sections: names of sections from SECTIONS, default DEFAULT_SECTIONS
+        :return: dict
+        """
+        if sections is None:
+            sections = self.DEFAULT_SECTIONS
+        for section in sections:
+            if section not in self.SECTIONS:
+                raise ValueError('Unknown section %s' % section)
+        return dict((section, getattr(self, self.SECTIONS[section])()) for section in sections)
+
     def reboot(self):
         raise NotImplementedError()
+
+    @contextmanager
+    def budget(self, seconds):
+        """
+        Limits time of everything done in the with block (eg. login and a few
+        getters) to seconds. Timeouts of requests are shortened to what is
+        left of the budget and no request is started once it is spent;
+        DeviceTimeout is raised instead.
+
+        ```
+        with ups.budget(60):
+            ups.login()
+            ups.get_all()
+        ```
+
+        :param seconds: None for no limit
+        """
+        previous = self.deadline
+        if seconds is not None:
+            deadline = _clock() + seconds
+            self.deadline = deadline if previous is None else min(previous, deadline)
+        try:
+            yield self
+        finally:
+            self.deadline = previous
+
+    def _timeout(self):
+        """
+        :return: (connect, read) timeouts for the next request
+        """
+        if self.deadline is None:
+            return (self.connect_timeout, self.read_timeout)
+        left = self.deadline - _clock()
+        if left <= 0:
+            raise DeviceTimeout('%s: time budget spent' % self.host)
+        return (min(self.connect_timeout, left), min(self.read_timeout, left))
+
+    def _url(self, path):
+        return self.base_url % self.host + path
+
+    def _request(self, method, path, **kwargs):
+        kwargs.setdefault('auth', self.auth)
+        # per request, session.verify is overridden by REQUESTS_CA_BUNDLE
+        kwargs.setdefault('verify', self.verify)
+        response = self._attempt(method, path, **kwargs)
+        if self._resumed:
+            # first request with a resumed session tells if it is still valid
+            if self._session_expired(response):
+                self._discard_session()
+                self.close()
+                self.login()
+                response = self._attempt(method, path, **kwargs)
+            else:
+                self._resumed = False
+                self._save_session()
+        return response
+
+    def _attempt(self, method, path, **kwargs):
+        """
+        Makes the request with timeouts from _timeout(). GET requests are
+        retried after connection errors and timeouts, other requests and GET
+        requests of NO_RETRY_PATHS may have changed something on the device
+        and are not.
+
+        :raises DeviceTimeout: if the device did not respond in time
+        """
+        retries = self.retries if method == 'GET' and path not in self.NO_RETRY_PATHS else 0
+        attempt = 0
+        while True:
+            kwargs['timeout'] = self._timeout()
+            try:
+                return self._send(method, path, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if isinstance(e, self.NO_RETRY):
+                    raise
+                delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+                spent = self.deadline is not None and _clock() + delay >= self.deadline
+                if attempt >= retries or spent:
+                    if isinstance(e, requests.exceptions.Timeout):
+                        raise DeviceTimeout('%s: %s' % (self.host, e))
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, method, path, **kwargs):
+        """
+        Makes the HTTP request and reports it to hooks:
+
+        * `request` event with labels driver, method, path, host, status and
+          connection (`new` if a TCP connection had to be opened, `reused` if a
+          kept-alive one was used)
+        * `request_error` event with labels driver, method, path, host and
+          error (exception class name) if there was no response
+        """
+        if not self.hooks:
+            return self.session.request(method, self._url(path), **kwargs)
+        labels = self._labels(path, method=method)
+        connections = self._connection_count(path)
+        start = _clock()
+        try:
+            response = self.session.request(method, self._url(path), **kwargs)
+        except Exception as e:
+            labels['error'] = type(e).__name__
+            self._emit('request_error', labels, _clock() - start)
+            raise
+        elapsed = _clock() - start
+        labels['status'] = str(response.status_code)
+        if connections is not None:
+            labels['connection'] = 'new' if self._connection_count(path) > connections else 'reused'
+        self._emit('request', labels, elapsed)
+        return response
+
+    def _labels(self, path, **labels):
+        labels.update(driver=type(self).__name__, path=path, host=self.host)
+        return labels
+
+    def _emit(self, event, labels, seconds):
+        for hook in self.hooks:
+            hook(event, labels, seconds)
+
+    def _connection_count(self, path):
+        """
+        :return: number of connections the adapter opened to the device so far, None if not known
+        """
+        url = urlparse(self._url(path))
+        poolmanager = getattr(self.session.get_adapter(self._url(path)), 'poolmanager', None)
+        if poolmanager is None:
+            return None
+        port = url.port or DEFAULT_PORTS.get(url.scheme)
+        count = 0
+        for key in poolmanager.pools.keys():
+            if getattr(key, 'key_host', None) == url.hostname and key.key_port == port:
+                pool = poolmanager.pools.get(key)
+                if pool is not None:
+                    count += pool.num_connections
+        return count
+
+    def _resume_session(self):
+        """
+        Drivers call this at the start of login(). Loads cookies of a saved
+        session from session_store. The session is checked on first request
+        and a real login is done then if it has expired.
+
+        :return: True if a saved session was loaded
+        """
+        if self.session_store is None:
+            return False
+        cookies = self.session_store.load(self.host, self.user)
+        if not cookies:
+            return False
+        self.session.cookies.update(cookies)
+        self._resumed = True
+        return True
+
+    def _save_session(self):
+        """
+        Drivers call this after a successful login().
+        """
+        if self.session_store is not None:
+            self.session_store.save(self.host, self.user, requests.utils.dict_from_cookiejar(self.session.cookies))
+
+    def _discard_session(self):
+        """
+        Drivers call this when the device session is ended (eg. in logout()).
+        """
+        self._resumed = False
+        if self.session_store is not None:
+            self.session_store.discard(self.host, self.user)
+
+    def _session_expired(self, response):
+        """
+        :return: True if response shows that device did not accept session cookies
+        """
+        return response.status_code in (401, 403)
+
+    def _get(self, path, **kwargs):
+        return self._request('GET', path, **kwargs)
+
+    def _post(self, path, data=None, **kwargs):
+        self._drop_page(path)
+        if path in self.FORM_PAGES:
+            self._drop_page(self.FORM_PAGES[path])
+        return self._request('POST', path, data=data, **kwargs)
+
+    def _drop_page(self, path):
+        url = self._url(path)
+        for cache in (self._pages, self._hashes, self._texts):
+            cache.pop(url, None)
+
+    def _submit_form(self, section, path, current_data, data, changes, dry_run=False):
+        """
+        Posts form data to path, unless it is the same as current_data (what
+        the device has now) or dry_run is set.
+
+        :return: upsconfer.diff.ChangeReport
+        """
+        report = ChangeReport(section, changes, diff_fields(current_data, data), dry_run=dry_run)
+        if report.changed and not dry_run:
+            response = self._post(path, data)
+            response.raise_for_status()
+            report.applied = True
+        return report
+
+    def _get_html(self, path, cache=True):
+        """
+        Returns parsed page at path. Each page is downloaded only once per
+        session, until a form is posted to it or the session is closed.
+
+        :param cache: set to False for pages with live readings that should always be downloaded
+        """
+        url = self._url(path)
+        html = self._pages.get(url) if cache else None
+        if html is not None:
+            self.cache_hits += 1
+            self._read(path)
+            return html
+        if cache:
+            self.cache_misses += 1
+        text = self._texts.pop(url, None) if cache else None
+        if text is None:
+            response = self._get(path)
+            response.raise_for_status()
+            text = response.text
+            if cache:
+                self._remember_page(path, response)
+        if self.hooks:
+            start = _clock()
+            html = self._parse(text, path)
+            self._emit('parse', self._labels(path), _clock() - start)
+        else:
+            html = self._parse(text, path)
+        if cache:
+            self._pages[url] = html
+            self._read(path)
+        return html
+
+    def _remember_page(self, path, response):
+        if self.page_store is None:
+            return
+        self._hashes[self._url(path)] = self.page_store.save_page(
+            self.host, path, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    def _read(self, path):
+        """
+        Adds page at path to pages read by running @tracked getters.
+        """
+        digest = self._hashes.get(self._url(path))
+        for pages in self._reading:
+            pages[path] = digest
+
+    def _page_hash(self, path):
+        """
+        Returns content hash of page at path without parsing it. The page is
+        downloaded at most once per session, with If-None-Match and
+        If-Modified-Since headers when the device sent ETag or Last-Modified
+        before. A downloaded page is kept for _get_html().
+        """
+        url = self._url(path)
+        if url in self._hashes:
+            return self._hashes[url]
+        known = self.page_store.page(self.host, path)
+        headers = {}
+        if known is not None:
+            if known['etag']:
+                headers['If-None-Match'] = known['etag']
+            if known['last_modified']:
+                headers['If-Modified-Since'] = known['last_modified']
+        response = self._get(path, headers=headers)
+        if response.status_code == 304 and known is not None:
+            self._hashes[url] = known['hash']
+            return known['hash']
+        response.raise_for_status()
+        self._texts[url] = response.text
+        self._remember_page(path, response)
+        return self._hashes[url]
+
+    def _pages_unchanged(self, pages):
+        """
+        :param pages: dict of path -> content hash, as saved by a @tracked getter
+        :return: True if all pages still have the same content
+        """
+        for path, digest in sorted(pages.items()):
+            if digest is None or self._page_hash(path) != digest:
+                return False
+        return True
+
+    def _parse(self, text, path=None):
+        if self.parse_fragments and path is not None:
+            text = self._fragment(path, text)
+        return lxml.html.document_fromstring(text, parser=_html_parser())
+
+    def _fragment(self, path, text):
+        """
+        :return: part of page text between FRAGMENTS markers of path (both included)
+        """
+        markers = self.FRAGMENTS.get(path, self.FRAGMENTS.get(None))
+        if not markers:
+            return text
+        start = text.find(markers[0])
+        end = text.rfind(markers[1])
+        if start < 0 or end < start:
+            return text
+        return text[start:end + len(markers[1])]
+
+    def _get_form(self, path):
+        """
+        Returns values of all form fields on page at path as a dict.
+        """
+        return FormExtractor.extract(self._get_html(path))
+
+    def _get_table(self, path, cache=True):
+        """
+        Returns labelled values from tables on page at path as a dict.
+        """
+        return TableExtractor.extract(self._get_html(path, cache))
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Local inventory of device info, SNMP and trap configuration stored in SQLite.
+
+```
+inv = Inventory('ups.db')
+inv.refresh(devices, ttl=24 * 3600)
+inv.find(driver='UpsSocomecNetys', agent_firmware_below='2.0h')
+inv.find(community='public')
+```
+"""
+
+import re
+import sqlite3
+import time
+from upsconfer import fleet
+
+INFO_TEXT = ['manufacturer', 'model', 'serial', 'firmware', 'agent_type', 'agent_firmware', 'agent_serial', 'mac_address']
+INFO_INT = ['rating_va', 'rating_w', 'battery_capacity_ah']
+SNMP_KEYS = ['ip', 'community', 'access']
+TRAP_KEYS = ['ip', 'community', 'version', 'severity', 'type', 'alias']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS device (
+    host TEXT PRIMARY KEY,
+    driver TEXT NOT NULL,
+    updated REAL,
+    stale INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    %s,
+    %s
+);
+CREATE INDEX IF NOT EXISTS device_driver ON device (driver);
+CREATE INDEX IF NOT EXISTS device_updated ON device (updated);
+CREATE INDEX IF NOT EXISTS device_serial ON device (serial);
+CREATE INDEX IF NOT EXISTS device_mac ON device (mac_address);
+CREATE TABLE IF NOT EXISTS snmp (
+    host TEXT NOT NULL REFERENCES device (host) ON DELETE CASCADE,
+    entry TEXT NOT NULL,
+    %s,
+    PRIMARY KEY (host, entry)
+);
+CREATE INDEX IF NOT EXISTS snmp_community ON snmp (community);
+CREATE TABLE IF NOT EXISTS trap (
+    host TEXT NOT NULL REFERENCES device (host) ON DELETE CASCADE,
+    entry TEXT NOT NULL,
+    %s,
+    PRIMARY KEY (host, entry)
+);
+CREATE INDEX IF NOT EXISTS trap_ip ON trap (ip);
+CREATE INDEX IF NOT EXISTS trap_community ON trap (community);
+""" % (
+    ', '.join('%s TEXT' % k for k in INFO_TEXT),
+    ', '.join('%s INTEGER' % k for k in INFO_INT),
+    ', '.join('%s TEXT' % k for k in SNMP_KEYS),
+    ', '.join('%s TEXT' % k for k in TRAP_KEYS),
+)
+
+
+def version_key(version):
+    """
+    Sort key for firmware versions: numeric parts compare as numbers, so '2.0h' < '2.0i' < '10.1'.
+    """
+    key = []
+    for part in re.findall(r'\d+|[^\d.\s]+', version or ''):
+        if part.isdigit():
+            key.append((0, int(part), ''))
+        else:
+            key.append((1, 0, part.lower()))
+    return key
+
+
+def _collate_version(a, b):
+    ka, kb = version_key(a), version_key(b)
+    return (ka > kb) - (ka < kb)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def snapshot(ups):
+    """
+    Operation used by Inventory.refresh() to read everything the inventory stores.
+    """
+    return ups.get_all(('info', 'snmp', 'trap'))
+
+
+class Inventory(object):
+    def __init__(self, path=':memory:'):
+        """
+        :param path: SQLite database file, created if it does not exist
+        """
+        self.db = sqlite3.connect(path)
+        self.db.create_collation('version', _collate_version)
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def store(self, host, driver, info=None, snmp=None, trap=None, updated=None):
+        """
+        Saves a snapshot of a device, replacing the previous one. Sections that
+        are None are left as they are.
+
+        :param driver: driver class or its name
+        :param info: dict as returned by get_info()
+        :param snmp: dict as returned by get_snmp_config()
+        :param trap: dict as returned by get_trap_config()
+        :param updated: unix time of the snapshot, defaults to now
+        """
+        driver = getattr(driver, '__name__', driver)
+        if updated is None:
+            updated = time.time()
+        with self.db:
+            self.db.execute('INSERT OR IGNORE INTO device (host, driver) VALUES (?, ?)', (host, driver))
+            self.db.execute('UPDATE device SET driver = ?, updated = ?, stale = 0, error = NULL WHERE host = ?',
+                            (driver, updated, host))
+            if info is not None:
+                columns = INFO_TEXT + INFO_INT
+                values = [info.get(k) for k in INFO_TEXT] + [_to_int(info.get(k)) for k in INFO_INT]
+                self.db.execute('UPDATE device SET %s WHERE host = ?' % ', '.join('%s = ?' % c for c in columns),
+                                values + [host])
+            for table, keys, config in (('snmp', SNMP_KEYS, snmp), ('trap', TRAP_KEYS, trap)):
+                if config is None:
+                    continue
+                self.db.execute('DELETE FROM %s WHERE host = ?' % table, (host,))
+                self.db.executemany(
+                    'INSERT INTO %s (host, entry, %s) VALUES (?, ?, %s)' % (table, ', '.join(keys), ', '.join('?' * len(keys))),
+                    [[host, entry] + [None if e.get(k) is None else '%s' % e.get(k) for k in keys]
+                     for entry, e in config.items()])
+
+    def store_error(self, host, driver, error):
+        """
+        Records a failed refresh of a device. Its previous snapshot is kept.
+        """
+        driver = getattr(driver, '__name__', driver)
+        with self.db:
+            self.db.execute('INSERT OR IGNORE INTO device (host, driver) VALUES (?, ?)', (host, driver))
+            self.db.execute('UPDATE device SET error = ? WHERE host = ?', ('%s' % error, host))
+
+    def mark_changed(self, *hosts):
+        """
+        Flags devices so they are refreshed on next refresh() regardless of their age.
+        """
+        with self.db:
+            self.db.executemany('UPDATE device SET stale = 1 WHERE host = ?', [(h,) for h in hosts])
+
+    def remove(self, *hosts):
+        with self.db:
+            self.db.executemany('DELETE FROM device WHERE host = ?', [(h,) for h in hosts])
+
+    def is_fresh(self, host, ttl, now=None):
+        if now is None:
+            now = time.time()
+        row = self.db.execute('SELECT updated, stale FROM device WHERE host = ?', (host,)).fetchone()
+        return row is not None and row[0] is not None and not row[1] and row[0] >= now - ttl
+
+    def stale(self, ttl, now=None):
+        """
+        :return: hosts that were last refreshed more than ttl seconds ago or were flagged with mark_changed()
+        """
+        if now is None:
+            now = time.time()
+        rows = self.db.execute('SELECT host FROM device WHERE stale OR updated IS NULL OR updated < ? ORDER BY host',
+                               (now - ttl,))
+        return [r[0] for r in rows]
+
+    def refresh(self, devices, ttl=0, workers=10, **driver_kwargs):
+        """
+        Reads info, SNMP and trap config of devices that are not in the
+        inventory, are older than ttl seconds or were flagged with
+        mark_changed(), and stores them. Other devices are not contacted.
+
+        :param devices: iterable of upsconfer.fleet.Device or (driver, host, user, password[, kwargs]) tuples
+        :param workers: number of devices refreshed at once
+        :return: list of upsconfer.fleet.Result for refreshed devices
+        """
+        now = time.time()
+        todo = (d for d in (fleet.as_device(d) for d in devices) if not self.is_fresh(d.host, ttl, now))
+        results = []
+        for result in fleet.run(todo, snapshot, workers=workers, **driver_kwargs):
+            device = result.device
+            if result.error is not None:
+                self.store_error(device.host, device.driver, result.error)
+            else:
+                self.store(device.host, device.driver, **result.value)
+            results.append(result)
+        return results
+
+    def get(self, host):
+        """
+        :return: dict with driver, updated, error, info, snmp and trap of the device or None
+        """
+        cur = self.db.execute('SELECT driver, updated, error, %s FROM device WHERE host = ?'
+                              % ', '.join(INFO_TEXT + INFO_INT), (host,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        info = {}
+        for k, v in zip(INFO_TEXT + INFO_INT, row[3:]):
+            if v is not None:
+                info[k] = '%s' % v
+        device = {'host': host, 'driver': row[0], 'updated': row[1], 'error': row[2], 'info': info}
+        for table, keys in (('snmp', SNMP_KEYS), ('trap', TRAP_KEYS)):
+            config = {}
+            for r in self.db.execute('SELECT entry, %s FROM %s WHERE host = ?' % (', '.join(keys), table), (host,)):
+                config[r[0]] = dict((k, v) for k, v in zip(keys, r[1:]) if v is not None)
+            device[table] = config
+        return device
+
+    def find(self, driver=None, community=None, trap_receiver=None, agent_firmware_below=None, **info):
+        """
+        Finds devices in the inventory. All given conditions must match.
+
+        :param driver: driver class or name, eg. 'UpsSocomecNetys'
+        :param community: device has an SNMP entry with this community
+        :param trap_receiver: device sends traps to this ip
+        :param agent_firmware_below: agent_firmware is lower than this version (see version_key())
+        :param info: other get_info() keys that must be equal, eg. model='UMO3'
+        :return: sorted list of hosts
+        """
+        where = []
+        params = []
+        if driver is not None:
+            where.append('driver = ?')
+            params.append(getattr(driver, '__name__', driver))
+        if community is not None:
+            where.append('host IN (SELECT host FROM snmp WHERE community = ?)')
+            params.append(community)
+        if trap_receiver is not None:
+            where.append('host IN (SELECT host FROM trap WHERE ip = ?)')
+            params.append(trap_receiver)
+        if agent_firmware_below is not None:
+            where.append('agent_firmware COLLATE version < ?')
+            params.append(agent_firmware_below)
+        for k, v in info.items():
+            if k not in INFO_TEXT + INFO_INT:
+                raise ValueError('Unknown info key %s' % k)
+            where.append('%s = ?' % k)
+            params.append(_to_int(v) if k in INFO_INT else v)
+        sql = 'SELECT host FROM device'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return [r[0] for r in self.db.execute(sql + ' ORDER BY host', params)]
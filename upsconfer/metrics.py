@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Aggregating request and parse timings reported by driver hooks and
+exporting them in Prometheus text format.
+
+```
+metrics = Metrics()
+ups = UpsSocomecNetys('myups.example.com', 'admin', 'mypass', hooks=[metrics])
+...
+print(metrics.to_prometheus())
+```
+"""
+
+import threading
+
+# event -> (metric name, help)
+HISTOGRAMS = {
+    'request': ('upsconfer_request_seconds', 'HTTP requests to devices, until the whole response is downloaded.'),
+    'parse': ('upsconfer_parse_seconds', 'Parsing of HTML pages downloaded from devices.'),
+}
+COUNTERS = {
+    'request_error': ('upsconfer_request_errors_total', 'HTTP requests to devices that got no response.'),
+}
+
+
+def _escape(value):
+    return ('%s' % value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (k, _escape(v)) for k, v in labels)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metrics(object):
+    """
+    Hook that collects timings of one or many devices (it is thread safe, so
+    one instance can be passed to all devices of upsconfer.fleet.run()).
+
+    Every event becomes a histogram (requests and parsing) or a counter
+    (failed requests) series per distinct set of labels.
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets=None, exclude=()):
+        """
+        :param buckets: upper bounds of histogram buckets in seconds
+        :param exclude: labels to leave out, eg. ('host',) for big fleets
+        """
+        self.buckets = tuple(sorted(buckets or self.BUCKETS))
+        self.exclude = frozenset(exclude)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def __call__(self, event, labels, seconds):
+        if event not in HISTOGRAMS and event not in COUNTERS:
+            return
+        key = (event, tuple(sorted((k, v) for k, v in labels.items() if k not in self.exclude)))
+        with self._lock:
+            if event in COUNTERS:
+                self._counters[key] = self._counters.get(key, 0) + 1
+                return
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # bucket counts, sum, count
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_prometheus(self):
+        """
+        :return: all metrics in Prometheus text exposition format
+        """
+        with self._lock:
+            histograms = dict((k, [list(v[0]), v[1], v[2]]) for k, v in self._histograms.items())
+            counters = dict(self._counters)
+        lines = []
+        for event in sorted(HISTOGRAMS):
+            name, help = HISTOGRAMS[event]
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s histogram' % name)
+            for (e, labels), (buckets, total, count) in sorted(histograms.items()):
+                if e != event:
+                    continue
+                for bound, n in zip(self.buckets + (float('inf'),), buckets + [count]):
+                    lines.append('%s_bucket%s %d' % (name, _format_labels(labels + (('le', _format_value(bound)),)), n))
+                lines.append('%s_sum%s %s' % (name, _format_labels(labels), _format_value(total)))
+                lines.append('%s_count%s %d' % (name, _format_labels(labels), count))
+        for event in sorted(COUNTERS):
+            name, help = COUNTERS[event]
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s counter' % name)
+            for (e, labels), n in sorted(counters.items()):
+                if e == event:
+                    lines.append('%s%s %d' % (name, _format_labels(labels), n))
+        return '\n'.join(lines) + '\n'
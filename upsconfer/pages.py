@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Change detection for pages downloaded from devices.
+
+For every page the store keeps a hash of its content and the ETag and
+Last-Modified headers (if the device sends them), and for every getter
+marked with @tracked its last result together with hashes of pages it was
+read from. When those pages did not change, the getter returns its last
+result without parsing anything.
+
+A driver keeps its own store for as long as it lives (eg. over many
+login/logout cycles of a poller). To remember pages of devices that are
+handled by a new driver object every time (eg. by upsconfer.fleet.run()),
+share one store between them:
+
+```
+pages = PageStore()
+for result in run(devices, 'get_snmp_config', page_store=pages):
+    if result.value is not None and result.value.changed:
+        ...
+```
+"""
+
+import functools
+import hashlib
+import threading
+from upsconfer import records
+
+
+def content_hash(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def _plain(value):
+    """
+    Copy of a getter result made of plain dicts, lists and strings, without
+    records and string subclasses (see records._plain_str()).
+    """
+    if isinstance(value, records.Record):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return dict((k, _plain(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return records._plain_str(value)
+
+
+class PageResult(dict):
+    """
+    Result of a @tracked getter. `changed` is False when the pages it was read
+    from are the same as on the previous call, and the result is the same too.
+    """
+
+    def __init__(self, value, changed=True):
+        super(PageResult, self).__init__(value)
+        self.changed = changed
+
+
+class PageStore(object):
+    """
+    In-memory store of page hashes and getter results, per host. Thread safe,
+    so one store can be shared by all devices of a fleet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._results = {}
+
+    def page(self, host, path):
+        """
+        :return: dict with hash, etag and last_modified of the page or None
+        """
+        return self._pages.get((host, path))
+
+    def save_page(self, host, path, content, etag=None, last_modified=None):
+        """
+        :return: content hash of the page
+        """
+        page = {'hash': content_hash(content), 'etag': etag, 'last_modified': last_modified}
+        with self._lock:
+            self._pages[host, path] = page
+        return page['hash']
+
+    def result(self, host, getter):
+        """
+        :return: (dict of path -> hash of pages read, result) of the last call of getter or None
+        """
+        return self._results.get((host, getter))
+
+    def save_result(self, host, getter, pages, value):
+        with self._lock:
+            self._results[host, getter] = (dict(pages), _plain(value))
+
+    def forget(self, host=None):
+        """
+        Drops everything stored for host, or for all hosts.
+        """
+        with self._lock:
+            if host is None:
+                self._pages.clear()
+                self._results.clear()
+                return
+            for store in (self._pages, self._results):
+                for key in [k for k in store if k[0] == host]:
+                    del store[key]
+
+
+def _typed(ups, getter, value):
+    if not getattr(ups, 'typed', False):
+        return value
+    return records.typed(getter, value)
+
+
+def _stored(ups, getter, value):
+    # copy of a stored result, a store can be shared by typed and plain drivers
+    if getattr(ups, 'typed', False):
+        return records.typed(getter, _plain(value))
+    return records.to_plain(value)
+
+
+def _result(value, changed):
+    if isinstance(value, dict):
+        return PageResult(value, changed=changed)
+    if isinstance(value, records.DeviceInfo):
+        # get_info() of typed drivers, a new record on every call (DeviceInfo is not SHARED)
+        object.__setattr__(value, 'changed', changed)
+    return value
+
+
+def tracked(getter):
+    """
+    Decorator for driver getters whose result depends only on (cacheable)
+    pages they read. See UpsGeneric._pages_unchanged(). Results of typed
+    drivers are converted to records (see upsconfer.records) here.
+    """
+    name = getter.__name__
+
+    @functools.wraps(getter)
+    def wrapper(self, *args, **kwargs):
+        store = self.page_store
+        if store is None or args or kwargs:
+            return _typed(self, name, getter(self, *args, **kwargs))
+        last = store.result(self.host, name)
+        if last is not None and self._pages_unchanged(last[0]):
+            return _result(_stored(self, name, last[1]), changed=False)
+        pages = {}
+        self._reading.append(pages)
+        try:
+            value = getter(self)
+        finally:
+            self._reading.pop()
+        value = _typed(self, name, value)
+        store.save_result(self.host, name, pages, value)
+        return _result(value, changed=True)
+
+    return wrapper
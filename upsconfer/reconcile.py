@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Bringing SNMP and trap configuration of many devices to a desired state.
+
+Desired state maps groups of devices to the configuration they should have.
+A device belongs to every group whose `hosts` patterns (shell style, see
+fnmatch) match its host and whose `drivers` (if given) include its driver:
+
+```
+groups:
+  all:
+    hosts: ['*']
+    trap:
+      '1': {ip: 10.6.8.7, community: traps}
+  dc1:
+    hosts: ['ups*.dc1.example.com']
+    drivers: [UpsSocomecNetys]
+    snmp:
+      default: {community: secret, access: ro}
+```
+
+```
+state = load_state('desired.yaml')
+report = reconcile(state, devices, inventory=inv, workers=20, vendor_concurrency={'riello': 5})
+print(report.counts())
+```
+"""
+
+import fnmatch
+import io
+import json
+import re
+import time
+from collections import namedtuple
+from upsconfer import fleet
+from upsconfer.diff import diff_config
+
+# section -> getter, setter
+SECTIONS = {
+    'snmp': ('get_snmp_config', 'set_snmp_config'),
+    'trap': ('get_trap_config', 'set_trap_config'),
+}
+GROUP_KEYS = ['hosts', 'drivers'] + sorted(SECTIONS)
+
+# outcomes of devices
+UNMANAGED = 'unmanaged'  # in no group, not contacted
+IN_SYNC = 'in_sync'      # inventory shows no drift, not contacted
+UNCHANGED = 'unchanged'  # contacted, device already had the desired config
+PLANNED = 'planned'      # contacted with dry_run, device would be changed
+CHANGED = 'changed'      # contacted, changes applied
+FAILED = 'failed'
+
+# status is one of the outcomes above, changes a dict of section -> ChangeReport
+# of contacted devices, error the exception of failed ones
+Outcome = namedtuple('Outcome', 'device status changes error elapsed')
+
+
+def load_state(path):
+    """
+    Reads desired state from a JSON file, or a YAML file (needs PyYAML) if
+    path ends with .yaml or .yml.
+
+    :return: DesiredState
+    """
+    with io.open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('PyYAML is needed to read %s' % path)
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return DesiredState((data or {}).get('groups') or {})
+
+
+def config_to_str(config):
+    """
+    YAML and JSON give numbers and bools where drivers use strings, eg. entry 1
+    or version 2.
+
+    :return: config with entries and values as strings, None values left out
+    """
+    return dict(('%s' % entry, dict((k, '%s' % v) for k, v in (values or {}).items() if v is not None))
+                for entry, values in config.items())
+
+
+class DesiredState(object):
+    def __init__(self, groups):
+        """
+        :param groups: dict of group name -> {'hosts': [patterns], 'drivers': [driver names], 'snmp': config, 'trap': config}
+        """
+        self.groups = []
+        for name in sorted(groups):
+            group = groups[name] or {}
+            unknown = set(group) - set(GROUP_KEYS)
+            if unknown:
+                raise ValueError('Group %s: unknown keys %s' % (name, ', '.join(sorted(unknown))))
+            hosts = group.get('hosts') or []
+            if not isinstance(hosts, list):
+                hosts = [hosts]
+            if not hosts:
+                raise ValueError('Group %s: hosts is empty' % name)
+            hosts = re.compile('|'.join('(?:%s)' % fnmatch.translate(h) for h in hosts))
+            drivers = group.get('drivers')
+            if drivers is not None:
+                drivers = frozenset([drivers] if not isinstance(drivers, list) else drivers)
+            config = dict((s, config_to_str(group[s])) for s in SECTIONS if group.get(s))
+            self.groups.append((name, hosts, drivers, config))
+
+    def groups_of(self, host, driver):
+        """
+        :param driver: driver class or its name
+        :return: sorted names of groups the device belongs to
+        """
+        driver = getattr(driver, '__name__', driver)
+        return [name for name, hosts, drivers, config in self.groups
+                if hosts.match(host) and (drivers is None or driver in drivers)]
+
+    def config_for(self, host, driver):
+        """
+        Merges config of all groups the device belongs to. Groups may add
+        entries or keys to each other, but must not set the same key of an
+        entry to different values.
+
+        :return: dict of section -> config, empty if the device is in no group
+        """
+        names = set(self.groups_of(host, driver))
+        merged = {}
+        # section, entry, key -> group that set it
+        origin = {}
+        for name, hosts, drivers, config in self.groups:
+            if name not in names:
+                continue
+            for section, entries in config.items():
+                for entry, values in entries.items():
+                    target = merged.setdefault(section, {}).setdefault(entry, {})
+                    for key, value in values.items():
+                        if key in target and target[key] != value:
+                            raise ValueError('%s: groups %s and %s set %s %s %s to %s and %s' % (
+                                host, origin[section, entry, key], name, section, entry, key, target[key], value))
+                        target[key] = value
+                        origin[section, entry, key] = name
+        return merged
+
+
+class Plan(object):
+    """
+    Devices that need to be contacted (`todo`, a list of (device, config)
+    tuples) and outcomes of the ones that do not (`skipped`).
+    """
+
+    def __init__(self):
+        self.todo = []
+        self.skipped = []
+
+
+def drift(snapshot, config):
+    """
+    :param snapshot: dict as returned by Inventory.get()
+    :param config: dict of section -> desired config
+    :return: dict of section -> list of (entry, key, old, new) differences, without sections that match
+    """
+    found = {}
+    for section, desired in config.items():
+        changes = diff_config(snapshot.get(section) or {}, desired)
+        if changes:
+            found[section] = changes
+    return found
+
+
+def plan(state, devices, inventory=None, ttl=None):
+    """
+    Decides which devices need to be contacted. Without an inventory that is
+    every device in a group. With an inventory devices whose stored snapshot
+    already matches the desired state are skipped as in sync, so only
+    devices with drift (or without a usable snapshot) are contacted.
+
+    :param devices: iterable of upsconfer.fleet.Device or (driver, host, user, password[, kwargs]) tuples
+    :param inventory: upsconfer.inventory.Inventory
+    :param ttl: do not trust snapshots older than ttl seconds
+    :return: Plan
+    """
+    result = Plan()
+    now = time.time()
+    for device in devices:
+        device = fleet.as_device(device)
+        config = state.config_for(device.host, device.driver)
+        if not config:
+            result.skipped.append(Outcome(device, UNMANAGED, {}, None, 0.0))
+            continue
+        if inventory is not None and (ttl is None or inventory.is_fresh(device.host, ttl, now)):
+            snapshot = inventory.get(device.host)
+            if snapshot is not None and snapshot['updated'] is not None and not drift(snapshot, config):
+                result.skipped.append(Outcome(device, IN_SYNC, {}, None, 0.0))
+                continue
+        result.todo.append((device, config))
+    return result
+
+
+def apply_config(ups, config, dry_run=False):
+    """
+    Operation run on each device: sets all sections in config with one
+    ups.update() call (one form submission on devices with a shared form).
+
+    Setters expect complete entries, so config is laid over the device's
+    current config first. Getters read the same (cached) pages as setters,
+    so this costs no extra requests.
+
+    :return: dict of section -> upsconfer.diff.ChangeReport
+    """
+    new_configs = {}
+    for section in sorted(config):
+        getter = SECTIONS[section][0]
+        new_config = getattr(ups, getter)()
+        for entry, values in config[section].items():
+            new_config[entry] = dict(new_config.get(entry) or {}, **values)
+        new_configs[section] = new_config
+    return ups.update(dry_run=dry_run, **new_configs)
+
+
+def apply(todo, dry_run=False, inventory=None, workers=10, vendor_concurrency=None, budget=None, **driver_kwargs):
+    """
+    Applies planned config to devices in parallel (see upsconfer.fleet.run()).
+    Setters only submit forms that differ from what the device has.
+
+    :param todo: Plan.todo
+    :param dry_run: only find out what would change
+    :param inventory: devices that were changed are flagged with Inventory.mark_changed()
+    :return: generator of Outcome, in order of completion
+    """
+    configs = dict((device.host, config) for device, config in todo)
+
+    def operation(ups):
+        return apply_config(ups, configs[ups.host], dry_run)
+
+    for result in fleet.run((device for device, config in todo), operation, workers=workers, budget=budget,
+                            vendor_concurrency=vendor_concurrency, **driver_kwargs):
+        if result.error is not None:
+            yield Outcome(result.device, FAILED, {}, result.error, result.elapsed)
+            continue
+        changes = result.value
+        if any(r.applied for r in changes.values()):
+            status = CHANGED
+            if inventory is not None:
+                inventory.mark_changed(result.device.host)
+        elif any(r.changed for r in changes.values()):
+            status = PLANNED
+        else:
+            status = UNCHANGED
+        yield Outcome(result.device, status, changes, None, result.elapsed)
+
+
+def reconcile(state, devices, dry_run=False, inventory=None, ttl=None, workers=10, vendor_concurrency=None,
+              budget=None, **driver_kwargs):
+    """
+    Plans and applies desired state to devices.
+
+    :param state: DesiredState
+    :param devices: iterable of upsconfer.fleet.Device or (driver, host, user, password[, kwargs]) tuples
+    :param dry_run: contact devices that need it, but do not change them
+    :param inventory: skip devices that are in sync according to this upsconfer.inventory.Inventory
+    :param ttl: do not trust inventory snapshots older than ttl seconds
+    :param workers: number of devices handled at once
+    :param vendor_concurrency: dict of vendor name -> maximum number of its devices handled at once
+    :param budget: seconds allowed for each device, see upsconfer.fleet.run_device()
+    :param driver_kwargs: passed to driver's constructor, eg. adapter
+    :return: Report
+    """
+    planned = plan(state, devices, inventory, ttl)
+    outcomes = list(planned.skipped)
+    outcomes.extend(apply(planned.todo, dry_run, inventory, workers, vendor_concurrency, budget, **driver_kwargs))
+    return Report(outcomes, dry_run)
+
+
+class Report(object):
+    """
+    Outcome of every device of a reconcile() run.
+    """
+
+    def __init__(self, outcomes, dry_run=False):
+        self.outcomes = outcomes
+        self.dry_run = dry_run
+
+    def __iter__(self):
+        return iter(self.outcomes)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def by_status(self, status):
+        return [o for o in self.outcomes if o.status == status]
+
+    @property
+    def failed(self):
+        return self.by_status(FAILED)
+
+    def counts(self):
+        """
+        :return: dict of status -> number of devices
+        """
+        counts = {}
+        for o in self.outcomes:
+            counts[o.status] = counts.get(o.status, 0) + 1
+        return counts
+
+    def to_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'counts': self.counts(),
+            'devices': [{
+                'host': o.device.host,
+                'driver': o.device.driver.__name__,
+                'status': o.status,
+                'changes': dict((s, r.to_dict()) for s, r in o.changes.items()),
+                'error': None if o.error is None else '%s' % o.error,
+                'elapsed': o.elapsed,
+            } for o in sorted(self.outcomes, key=lambda o: o.device.host)],
+        }
+
+    def __repr__(self):
+        return '<Report dry_run=%s %s>' % (self.dry_run, ' '.join(
+            '%s=%d' % item for item in sorted(self.counts().items())))
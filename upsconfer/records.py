@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+
+"""
+Compact, typed records for results of get_snmp_config(), get_trap_config()
+and get_info(), for keeping snapshots of many devices in memory.
+
+Records have __slots__ instead of a dict per entry, enum-like values
+(access, severity, type, version) and other often repeated strings are
+interned, ratings are numbers, and records are immutable, so equal entries
+(eg. the unused trap receivers of every device) are one shared object.
+Shared strings and entries are kept for the life of the process; they
+repeat across a fleet, so there are few of them.
+
+Drivers return them when created with `typed=True`:
+
+```
+ups = UpsSocomecNetys('myups.example.com', 'admin', 'mypass', typed=True)
+config = ups.get_trap_config()    # {'1': TrapEntry(ip='10.6.8.7', ...), ...}
+config['1'].severity
+config['1'].to_dict()
+config['1'].diff(old['1'])        # [('severity', 'none', 'info')]
+```
+
+Records can also be read like dicts (`entry['ip']`, `entry.get('alias')`,
+`dict(entry)`), so they can be passed to setters and upsconfer.diff as they
+are. Keys a device does not have (eg. `ip` of the `default` SNMP entry) are
+left out, like in the dicts drivers return.
+"""
+
+_text = type(u'')
+
+# marks fields that are not set
+_UNSET = object()
+
+# value -> the one shared copy of it
+_VALUES = {}
+# (record class, values) -> the one shared record with those values
+_RECORDS = {}
+
+
+def _plain_str(value):
+    # string subclasses (eg. lxml xpath results) reference the whole parsed page
+    if isinstance(value, _text) and type(value) is not _text:
+        return _text(value)
+    if isinstance(value, bytes) and type(value) is not bytes:
+        return bytes(value)
+    return value
+
+
+def intern_value(value):
+    """
+    :return: shared string equal to value, other values as they are
+    """
+    if type(value) is not _text and type(value) is not bytes:
+        value = _plain_str(value)
+        if not isinstance(value, (_text, bytes)):
+            return value
+    return _VALUES.setdefault(value, value)
+
+
+def _number(value):
+    """
+    :return: value as int or float, or value as it is if it is not a number
+    """
+    if not isinstance(value, (_text, bytes)):
+        return value
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _rebuild(cls, values):
+    return cls.from_dict(values)
+
+
+class Record(object):
+    """
+    Base of records. Subclasses list their keys in FIELDS (and __slots__),
+    keys with values that repeat across devices in INTERNED and numeric keys
+    in NUMERIC. Records of classes with SHARED set are made once for equal
+    values, those should not have values unique to a device.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    INTERNED = frozenset()
+    NUMERIC = frozenset()
+    SHARED = False
+
+    def __init__(self, **values):
+        """
+        :raises TypeError: for keys that are not in FIELDS
+        """
+        fields, interned, numeric = self.FIELDS, self.INTERNED, self.NUMERIC
+        for key, value in values.items():
+            if key not in fields:
+                raise TypeError('%s has no field %s' % (type(self).__name__, key))
+            if key in numeric:
+                value = _number(value)
+            object.__setattr__(self, key, intern_value(value) if key in interned else _plain_str(value))
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        :param values: dict as returned by drivers
+        :return: record, the shared one for classes with SHARED set
+        """
+        if not cls.SHARED:
+            return cls(**values)
+        key = (cls,) + tuple([values.get(k, _UNSET) for k in cls.FIELDS])
+        record = _RECORDS.get(key)
+        # keys that are not in FIELDS are not in key, let the constructor refuse them
+        if record is None or len(values) != len(key) - 1 - key.count(_UNSET):
+            record = cls(**values)
+            record = _RECORDS.setdefault((cls,) + record._values(), record)
+        return record
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is read only' % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s is read only' % type(self).__name__)
+
+    def __reduce__(self):
+        return _rebuild, (type(self), self.to_dict())
+
+    def _values(self):
+        return tuple([getattr(self, key, _UNSET) for key in self.FIELDS])
+
+    def keys(self):
+        return [key for key in self.FIELDS if hasattr(self, key)]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def to_dict(self):
+        """
+        :return: dict of set keys, in the format drivers return without typed
+        """
+        return dict(self.items())
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def __getitem__(self, key):
+        value = self.get(key, _UNSET)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self.FIELDS and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash((type(self), self._values()))
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % item for item in self.items()))
+
+    def replace(self, **values):
+        """
+        :return: record with values changed
+        """
+        return type(self).from_dict(dict(self.to_dict(), **values))
+
+    def diff(self, other):
+        """
+        Compares with other (record or dict), like upsconfer.diff.diff_config()
+        compares entries: only keys of self, values compared as strings.
+
+        :return: list of (key, value in self, value in other) for keys that differ, in FIELDS order
+        """
+        changes = []
+        for key in self.keys():
+            old = getattr(self, key)
+            new = other.get(key)
+            if '%s' % old != '%s' % new:
+                changes.append((key, old, new))
+        return changes
+
+
+class SnmpEntry(Record):
+    """
+    Entry of get_snmp_config().
+    """
+    __slots__ = FIELDS = ('ip', 'community', 'access')
+    INTERNED = frozenset(FIELDS)
+    SHARED = True
+
+
+class TrapEntry(Record):
+    """
+    Entry of get_trap_config().
+    """
+    __slots__ = FIELDS = ('ip', 'community', 'version', 'severity', 'type', 'alias')
+    INTERNED = frozenset(FIELDS)
+    SHARED = True
+
+
+class DeviceInfo(Record):
+    """
+    Result of get_info(), ratings are numbers. `changed` is False when the
+    pages it was read from did not change (like `changed` of config dicts, see
+    upsconfer.pages). It is not one of the keys and is not compared.
+    """
+    FIELDS = ('manufacturer', 'agent_type', 'model', 'serial', 'firmware', 'agent_firmware',
+              'agent_serial', 'mac_address', 'rating_va', 'rating_w', 'battery_capacity_ah')
+    __slots__ = FIELDS + ('changed',)
+    INTERNED = frozenset(['manufacturer', 'agent_type', 'model', 'firmware', 'agent_firmware'])
+    NUMERIC = frozenset(['rating_va', 'rating_w', 'battery_capacity_ah'])
+
+    def __init__(self, **values):
+        super(DeviceInfo, self).__init__(**values)
+        object.__setattr__(self, 'changed', True)
+
+
+def snmp_config(config):
+    """
+    :return: dict of entry -> SnmpEntry for config as returned by get_snmp_config()
+    """
+    return dict((intern_value(entry), SnmpEntry.from_dict(values)) for entry, values in config.items())
+
+
+def trap_config(config):
+    """
+    :return: dict of entry -> TrapEntry for config as returned by get_trap_config()
+    """
+    return dict((intern_value(entry), TrapEntry.from_dict(values)) for entry, values in config.items())
+
+
+def device_info(info):
+    """
+    :return: DeviceInfo for info as returned by get_info()
+    """
+    return DeviceInfo.from_dict(info)
+
+
+# getter -> conversion of its result, used by drivers created with typed=True
+GETTERS = {
+    'get_snmp_config': snmp_config,
+    'get_trap_config': trap_config,
+    'get_info': device_info,
+}
+
+
+def typed(getter, value):
+    """
+    :return: result of getter converted to records, other getters' results as they are
+    """
+    convert = GETTERS.get(getter)
+    if convert is None or isinstance(value, Record):
+        return value
+    if isinstance(value, dict) and value and all(isinstance(v, Record) for v in value.values()):
+        return value
+    return convert(value)
+
+
+def to_plain(value):
+    """
+    :return: value with records (also in dicts and lists) replaced with dicts, eg. to dump it as JSON
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return dict((k, to_plain(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [to_plain(v) for v in value]
+    return value
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Registry of drivers by class name. Driver modules are imported only when a
+driver is first asked for, so tools that need one vendor (or none) do not
+pay for importing the others.
+
+Other packages can add drivers with an entry point in the `upsconfer.drivers`
+group, named after the driver class:
+
+```
+setup(
+    ...
+    entry_points={'upsconfer.drivers': ['UpsAcmeSmart = upsconfer_acme:UpsAcmeSmart']},
+)
+```
+
+```
+driver = registry.get('UpsSocomecNetys')
+ups = driver('myups.example.com', 'admin', 'mypass')
+```
+"""
+
+import importlib
+import threading
+
+ENTRY_POINT_GROUP = 'upsconfer.drivers'
+
+# drivers of this package: class name -> 'module:class'
+BUILTIN = {
+    'UpsSocomecNetys': 'upsconfer.socomec:UpsSocomecNetys',
+    'UpsSocomecMasterys': 'upsconfer.socomec:UpsSocomecMasterys',
+    'UpsRielloSentinel': 'upsconfer.riello:UpsRielloSentinel',
+}
+
+# name -> driver class, 'module:class' string or entry point, loaded on first get()
+_drivers = dict(BUILTIN)
+_scanned = False
+_lock = threading.Lock()
+_strings = (str, type(u''))
+
+
+def _entry_points():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        try:
+            import pkg_resources
+        except ImportError:
+            return []
+        return list(pkg_resources.iter_entry_points(ENTRY_POINT_GROUP))
+    found = entry_points()
+    if hasattr(found, 'select'):
+        return list(found.select(group=ENTRY_POINT_GROUP))
+    return list(found.get(ENTRY_POINT_GROUP, []))
+
+
+def _scan():
+    """
+    Adds drivers from entry points, once. Drivers of this package and ones
+    added with register() are not replaced.
+    """
+    global _scanned
+    if _scanned:
+        return
+    with _lock:
+        if _scanned:
+            return
+        for entry_point in _entry_points():
+            _drivers.setdefault(entry_point.name, entry_point)
+        _scanned = True
+
+
+def register(name, driver):
+    """
+    :param name: driver class name
+    :param driver: driver class or 'module:class' string, imported on first get()
+    """
+    _drivers[name] = driver
+
+
+def _load(target):
+    if isinstance(target, _strings):
+        module, attr = target.split(':')
+        return getattr(importlib.import_module(module), attr)
+    if hasattr(target, 'load') and not isinstance(target, type):
+        return target.load()
+    return target
+
+
+def get(name):
+    """
+    :return: driver class called name
+    :raises KeyError: if there is no such driver
+    """
+    target = _drivers.get(name)
+    if target is None:
+        _scan()
+        target = _drivers.get(name)
+    if target is None:
+        raise KeyError('Unknown driver %s, one of %s expected' % (name, ', '.join(names())))
+    if isinstance(target, type):
+        return target
+    driver = _load(target)
+    _drivers[name] = driver
+    return driver
+
+
+def names():
+    """
+    :return: sorted names of all drivers, without importing them
+    """
+    _scan()
+    return sorted(_drivers)
+
+
+def all_drivers():
+    """
+    :return: dict of name -> driver class, imports all drivers
+    """
+    return dict((name, get(name)) for name in names())
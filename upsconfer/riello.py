@@ -22,9 +22,11 @@
 
 
 import requests
-import lxml.html
+from upsconfer.diff import ChangeReport, diff_config, diff_fields
 from upsconfer.exceptions import LoginFailure
 from upsconfer.generic import UpsGeneric
+from upsconfer.pages import tracked
+from upsconfer.spec import Field, FormSpec, Rows
 from upsconfer.util import get_list_item
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
@@ -33,79 +35,114 @@ requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
 
 class UpsRielloSentinel(UpsGeneric):
+    vendor = 'riello'
+    base_url = 'https://%s'
+    verify = False
+    FORM_PAGES = {
+        '/cgi-bin/snmp_config_w.cgi': '/cgi-bin/snmp_config.cgi',
+    }
+    # pages start with a lot of scripts and menus
+    FRAGMENTS = {
+        '/cgi-bin/view_about.cgi': ('<table class="devicedata"', '</table>'),
+        '/cgi-bin/snmp_config.cgi': ('<form id="myForm"', '</form>'),
+    }
+    # the device acts on these as soon as they arrive, even if the response is lost
+    NO_RETRY_PATHS = frozenset(['/cgi-bin/reboot_2.cgi', '/cgi-bin/logout.cgi'])
+    # set by reboot(), logout() then makes no request
+    _rebooted = False
+    # forms/riello/sentinel/snmp_config.html; only the read only community is shown,
+    # set_snmp_config() writes the one of the given access
+    SNMP_FORM = FormSpec([
+        Rows([('default', 0)], [
+            Field('community', 'snmp_cconfig{row}', default='', strip=True),
+        ], constants={'access': 'ro'}),
+    ])
+    # trap receivers 1-7 in rows 0-6 share one community, written from entry 1
+    TRAP_FORM = FormSpec([
+        Rows([('1', 0)], [
+            Field('ip', 'snmp_config{row}', default='', strip=True),
+            Field('community', 'snmp_cconfig2', default='', strip=True),
+        ]),
+        Rows([(str(i + 1), i) for i in range(1, 7)], [
+            Field('ip', 'snmp_config{row}', default='', strip=True),
+            Field('community', 'snmp_cconfig2', default='', strip=True, write=False),
+        ], partial=True),
+    ])
+
     def login(self):
+        self._rebooted = False
+        if self._resume_session():
+            return True
         data = {
             'username': self.user,
             'password': self.password,
             }
-        response = requests.post('https://%s/cgi-bin/login.cgi' % self.host, data=data, verify=False)
+        response = self._post('/cgi-bin/login.cgi', data)
         if not response.ok or not len(response.cookies):
             raise LoginFailure()
-        self.cookies = response.cookies
+        self._save_session()
         return True
 
+    def _session_expired(self, response):
+        # device serves the login form when session is not valid
+        return 'login.cgi' in response.url or 'cgi-bin/login.cgi' in response.text
+
+    @tracked
     def get_snmp_config(self):
         """
         forms/riello/sentinel/snmp_config.html
         """
-        response = requests.get('https://%s/cgi-bin/snmp_config.cgi' % self.host, cookies=self.cookies, verify=False)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
-        config = {}
-        config['default'] = {}
-        config['default']['community'] = get_list_item(html.xpath('//input[@id="snmp_cconfig0"]/@value'), 0, '').strip()
-        config['default']['access'] = 'ro'
-        return config
-
-    def set_snmp_config(self, new_config):
-        data = self._get_snmp_form()
-        if new_config['default']['access'] == 'ro':
-            data['snmp_cconfig0'] = new_config['default']['community']
-        elif new_config['default']['access'] == 'rw':
-            data['snmp_cconfig1'] = new_config['default']['community']
-        response = requests.post('https://%s/cgi-bin/snmp_config_w.cgi' % self.host,
-                                 cookies=self.cookies,
-                                 data=data,
-                                 verify=False)
-        response.raise_for_status()
-        return True
+        return self.SNMP_FORM.decode(self._get_form('/cgi-bin/snmp_config.cgi'))
+
+    def set_snmp_config(self, new_config, dry_run=False):
+        return self.update(snmp=new_config, dry_run=dry_run)['snmp']
 
+    @tracked
     def get_trap_config(self):
         """
         forms/riello/sentinel/snmp_config.html
         """
-        response = requests.get('https://%s/cgi-bin/snmp_config.cgi' % self.host, cookies=self.cookies, verify=False)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
-        config = {}
-        for i in range(0, 7):
-            entry = {}
-            entry['ip'] = get_list_item(html.xpath('//input[@id="snmp_config%d"]/@value' % i), 0, '').strip()
-            entry['community'] = get_list_item(html.xpath('//input[@id="snmp_cconfig2"]/@value'), 0, '').strip()
-            config[str(i+1)] = entry
-        return config
-
-    def set_trap_config(self, new_config):
-        data = self._get_snmp_form()
-        data['snmp_cconfig2'] = new_config['1']['community']
-        for i in range(0, 7):
-            if str(i+1) not in new_config:
-                continue
-            data['snmp_config%d' % i] = new_config[str(i+1)]['ip']
-        response = requests.post('https://%s/cgi-bin/snmp_config_w.cgi' % self.host,
-                                 cookies=self.cookies,
-                                 data=data,
-                                 verify=False)
-        response.raise_for_status()
-        return True
+        return self.TRAP_FORM.decode(self._get_form('/cgi-bin/snmp_config.cgi'))
 
+    def set_trap_config(self, new_config, dry_run=False):
+        return self.update(trap=new_config, dry_run=dry_run)['trap']
+
+    def update(self, snmp=None, trap=None, dry_run=False):
+        """
+        SNMP and trap configuration are on the same form, changes of both are
+        submitted with one POST.
+        """
+        current = self._get_snmp_form()
+        data = dict(current)
+        reports = {}
+        if snmp is not None:
+            section = dict(current)
+            if snmp['default']['access'] == 'ro':
+                section['snmp_cconfig0'] = snmp['default']['community']
+            elif snmp['default']['access'] == 'rw':
+                section['snmp_cconfig1'] = snmp['default']['community']
+            data.update(section)
+            reports['snmp'] = ChangeReport('snmp', diff_config(self.get_snmp_config(), snmp),
+                                           diff_fields(current, section), dry_run=dry_run)
+        if trap is not None:
+            section = self.TRAP_FORM.encode(trap)
+            data.update(section)
+            reports['trap'] = ChangeReport('trap', diff_config(self.get_trap_config(), trap),
+                                           diff_fields(current, section), dry_run=dry_run)
+        changed = [report for report in reports.values() if report.changed]
+        if changed and not dry_run:
+            response = self._post('/cgi-bin/snmp_config_w.cgi', data)
+            response.raise_for_status()
+            for report in changed:
+                report.applied = True
+        return reports
+
+    @tracked
     def get_info(self):
         """
         forms/riello/sentinel/view_about.html
         """
-        response = requests.get('https://%s/cgi-bin/view_about.cgi' % self.host, cookies=self.cookies, verify=False)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
+        html = self._get_html('/cgi-bin/view_about.cgi')
         xpaths = {
             'model': '//td[node()="Model"]/following-sibling::td/text()',
             'serial': '//td[node()="Identification number"]/following-sibling::td/text()',
@@ -130,23 +167,28 @@ class UpsRielloSentinel(UpsGeneric):
 
     def _get_snmp_form(self):
         # get current values from form
-        response = requests.get('https://%s/cgi-bin/snmp_config.cgi' % self.host, cookies=self.cookies, verify=False)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
+        form = self._get_form('/cgi-bin/snmp_config.cgi')
         data = {}
         data['enable_snmp'] = 'on'
         for k in ['snmp_cconfig0', 'snmp_cconfig1', 'snmp_cconfig2', 'snmp_sysC', 'snmp_sysN', 'snmp_sysL', 'session']:
-            data[k] = get_list_item(html.xpath('//input[@name="%s"]/@value' % k), 0, '').strip()
+            data[k] = form.get(k, '').strip()
         for i in range(0, 7):
-            data['snmp_config%d' % i] = get_list_item(html.xpath('//input[@name="snmp_config%d"]/@value' % i), 0, '').strip()
+            data['snmp_config%d' % i] = form.get('snmp_config%d' % i, '').strip()
         return data
 
     def logout(self):
-        requests.get('https://%s/cgi-bin/logout.cgi' % self.host, cookies=self.cookies, verify=False)
-        self.cookies = None
+        """
+        Nothing to logout from after reboot(), the device is restarting.
+        """
+        self._discard_session()
+        if not self._rebooted:
+            self._get('/cgi-bin/logout.cgi')
+        self.close()
         return True
 
     def reboot(self):
-        requests.get('https://%s/cgi-bin/reboot_2.cgi' % self.host, cookies=self.cookies, verify=False)
-        self.cookies = None
+        self._discard_session()
+        self._get('/cgi-bin/reboot_2.cgi')
+        self._rebooted = True
+        self.close()
         return True
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Persistent store of login sessions, so that short lived processes can reuse
+a session instead of logging in again.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import time
+from upsconfer.util import makedirs, write_json
+
+
+class SessionStore(object):
+    """
+    Keeps session cookies in a directory, one JSON file per host and user.
+
+    Files are replaced atomically (written to a temporary file and renamed),
+    so several processes can use the same directory at once. Passwords are
+    never stored.
+    """
+
+    def __init__(self, directory, max_age=600):
+        """
+        :param directory: where session files are kept, created if it does not exist
+        :param max_age: seconds after which a saved session is not reused any more
+        """
+        self.directory = directory
+        self.max_age = max_age
+        makedirs(directory, 0o700)
+
+    def _path(self, host, user):
+        key = hashlib.sha1(('%s\0%s' % (host, user)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.json')
+
+    def load(self, host, user):
+        """
+        :return: dict of cookies of a saved session or None if there is no fresh session
+        """
+        try:
+            with open(self._path(host, user)) as f:
+                saved = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if saved.get('host') != host or saved.get('user') != user:
+            return None
+        if time.time() - saved.get('saved', 0) > self.max_age:
+            return None
+        return saved.get('cookies') or None
+
+    def save(self, host, user, cookies):
+        write_json(self._path(host, user), {'host': host, 'user': user, 'saved': time.time(), 'cookies': cookies})
+
+    def discard(self, host, user):
+        try:
+            os.unlink(self._path(host, user))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
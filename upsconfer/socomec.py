@@ -22,15 +22,47 @@
 
 
 import re
-import requests
+from datetime import datetime
 from hashlib import md5
-import lxml.html
+import requests
+from upsconfer.diff import diff_config
+from upsconfer.events import EventReader
 from upsconfer.exceptions import LoginFailure
 from upsconfer.generic import UpsGeneric
-from upsconfer.util import char_range, get_list_item, get_dict_key
+from upsconfer.pages import tracked
+from upsconfer.spec import Field, FormSpec, Rows, ValueMap
+from upsconfer.util import char_range, get_number
+
+
+def _norm_ip(addr):
+    return '.'.join([str(int(o)) for o in addr.split('.')])
+
+
+def _masterys_trap_type(value):
+    """
+    Masterys has one field for trap severity and type: 1 is severity none,
+    2 and 3 are proprietary and rfc traps of all severities.
+    """
+    severity, type = value
+    if severity == 'none':
+        return '1'
+    if type == 'proprietary':
+        return '2'
+    return '3'
 
 
 class UpsSocomecNetys(UpsGeneric):
+    vendor = 'socomec'
+    SECTIONS = dict(UpsGeneric.SECTIONS, status='get_status')
+    FORM_PAGES = {
+        '/tgi/net_snmpaccess1.tgi': '/net_snmpaccess1.htm',
+        '/tgi/net_trapaccess.tgi': '/net_snmptrap.htm',
+    }
+    # content of every page is in one table, after a big navigation menu
+    FRAGMENTS = {
+        None: ('<table CELLSPACING="5"', '<div CLASS="bottomPage">'),
+        '/': None,
+    }
     MAP_SEV_PER = {
         'none': 'non',
         'info': 'inf',
@@ -45,135 +77,119 @@ class UpsSocomecNetys(UpsGeneric):
         'proprietary': 'v4',
         'rfc': 'rfc'
     }
+    # forms/socomec/netys/net_snmpaccess1.htm: default in row 1, entries 1-7 in rows 2-8
+    SNMP_FORM = FormSpec([
+        Rows([('default', 1)], [
+            Field('community', 'CO{row}'),
+            Field('access', 'PE{row}'),
+        ], constants={'ip': '0.0.0.0'}),
+        Rows([(str(i - 1), i) for i in range(2, 9)], [
+            Field('ip', 'NM{row}', decode=_norm_ip),
+            Field('community', 'CO{row}'),
+            Field('access', 'PE{row}'),
+        ]),
+    ])
+    # forms/socomec/netys/net_snmptrap.htm
+    TRAP_FORM = FormSpec([
+        Rows([(str(i), i) for i in range(1, 9)], [
+            Field('ip', 'NMS{row}'),
+            Field('community', 'COM{row}'),
+            Field('severity', 'PER{row}', ValueMap(MAP_SEV_PER, form_default='non')),
+            Field('version', 'TTT{row}', ValueMap(MAP_VER_TTT, form_default='1')),
+            Field('type', 'TYP{row}', ValueMap(MAP_TYPE_TYP, form_default='rfc')),
+        ]),
+    ], form_constants={'Submit': 'Submit'})
+    # label on status pages -> (key in get_status(), conversion)
+    STATUS_FIELDS = {
+        'Input Voltage:': ('input_voltage', float),
+        'Input Frequency:': ('input_frequency', float),
+        'Output Voltage:': ('output_voltage', float),
+        'Output Frequency:': ('output_frequency', float),
+        'Output Current:': ('output_current', float),
+        'Output Source:': ('output_source', None),
+        'Loading Level:': ('load', int),
+        'Bypass Voltage:': ('bypass_voltage', float),
+        'Bypass Frequency:': ('bypass_frequency', float),
+        'Battery Status:': ('battery_status', None),
+        'Battery Capacity:': ('battery_charge', int),
+        'Battery Voltage:': ('battery_voltage', float),
+        'Temperature:': ('battery_temperature', float),
+        'On Battery Time:': ('on_battery_time', 'seconds'),
+        'Remaining Time:': ('runtime', 'seconds'),
+    }
+    # status indicators that are lit during normal operation
+    STATUS_STATES = ['Load On Inverter', 'Load On Bypass', 'Load On Battery', 'Economic Mode',
+                     'UPS In Standby Mode', 'Auto Test In Progress', 'Load Off']
 
     def login(self):
         """
         forms/socomec/netys/login.htm
         """
-        response = requests.get('http://%s/' % self.host)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
+        if self._resume_session():
+            return True
+        # challenge changes with every request
+        html = self._get_html('/', cache=False)
         xp_challenge = '//input[@name="Challenge"]/@value'
         challenge = html.xpath(xp_challenge)[0]
         if not challenge:
             LoginFailure('Could not find challenge.')
         ch_str = '%s%s%s' % (self.user, self.password, challenge)
-        response = md5(ch_str).hexdigest()
+        response = md5(ch_str.encode('utf-8')).hexdigest()
         data = {
             'Username': self.user,
             'Password': '',
             'Challenge': '',
             'Response': response
             }
-        response = requests.post('http://%s/tgi/login.tgi' % self.host, data)
+        response = self._post('/tgi/login.tgi', data)
         if not response.ok:
             raise LoginFailure()
-        self.cookies = response.cookies
+        self._save_session()
         return True
 
+    def _session_expired(self, response):
+        # device serves the login page when session is not valid
+        return bool(re.search(r'name="?Challenge', response.text, re.I))
+
     def logout(self):
         """
-        Does not support logout. Just clear any existing cookies.
+        Does not support logout. Just clear any existing cookies. A session
+        saved in session_store is kept for reuse.
         """
-        self.cookies = None
+        self.close()
         return True
 
+    @tracked
     def get_snmp_config(self):
         """
         forms/socomec/netys/net_snmpaccess1.htm
         """
-        response = requests.get('http://%s/net_snmpaccess1.htm' % self.host, cookies=self.cookies)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
-        xp_ip = '//input[@name="NM{nr}"]/@value'
-        xp_community = '//input[@name="CO{nr}"]/@value'
-        xp_access = '//select[@name="PE{nr}"]/option[@selected]/@value'
-        norm_ip = lambda addr: '.'.join([str(int(o)) for o in addr.split('.')])
-        config = {}
-        config['default'] = {'ip': '0.0.0.0'}
-        config['default']['community'] = html.xpath(xp_community.format(nr=1))[0]
-        config['default']['access'] = html.xpath(xp_access.format(nr=1))[0]
-        for i in range(2, 9):
-            config[str(i-1)] = {'ip': norm_ip(html.xpath(xp_ip.format(nr=i))[0])}
-            config[str(i-1)]['community'] = html.xpath(xp_community.format(nr=i))[0]
-            config[str(i-1)]['access'] = html.xpath(xp_access.format(nr=i))[0]
-        return config
-
-    def set_snmp_config(self, new_config):
-        """
-        Form structure:
-        CO1: <default->community>
-        PE1: <default->access>[valid values: none|ro|rw]
-        NM2: <1->ip>
-        CO2: <1->community>
-        PE2: <1->access>
-        ...
-        PE8: <7->access>
-        """
-        config = self.get_snmp_config()
+        return self.SNMP_FORM.decode(self._get_form('/net_snmpaccess1.htm'))
+
+    def set_snmp_config(self, new_config, dry_run=False):
+        current = self.get_snmp_config()
+        config = dict(current)
         config.update(new_config)
-        data = {}
-        data['CO1'] = config['default']['community']
-        data['PE1'] = config['default']['access']
-        for i in range(2, 9):
-            data['NM%d' % i] = config[str(i-1)]['ip']
-            data['CO%d' % i] = config[str(i-1)]['community']
-            data['PE%d' % i] = config[str(i-1)]['access']
-        response = requests.post('http://%s/tgi/net_snmpaccess1.tgi' % self.host,
-                                 cookies=self.cookies,
-                                 data=data)
-        response.raise_for_status()
-        return True
+        return self._submit_form('snmp', '/tgi/net_snmpaccess1.tgi',
+                                 self.SNMP_FORM.encode(current), self.SNMP_FORM.encode(config),
+                                 diff_config(current, new_config), dry_run)
 
+    @tracked
     def get_trap_config(self):
         """
         forms/socomec/netys/net_snmptrap.htm
         """
-        response = requests.get('http://%s/net_snmptrap.htm' % self.host, cookies=self.cookies)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
-        xp_ip = '//input[@name="NMS{nr}"]/@value'
-        xp_community = '//input[@name="COM{nr}"]/@value'
-        xp_severity = '//select[@name="PER{nr}"]/option[@selected]/@value'
-        xp_ver = '//select[@name="TTT{nr}"]/option[@selected]/@value'
-        xp_type = '//select[@name="TYP{nr}"]/option[@selected]/@value'
-        config = {}
-        for i in range(1, 9):
-            config[str(i)] = {'ip': html.xpath(xp_ip.format(nr=i))[0]}
-            config[str(i)]['community'] = html.xpath(xp_community.format(nr=i))[0]
-            config[str(i)]['severity'] = get_dict_key(self.MAP_SEV_PER, html.xpath(xp_severity.format(nr=i))[0])
-            config[str(i)]['version'] = get_dict_key(self.MAP_VER_TTT, html.xpath(xp_ver.format(nr=i))[0])
-            config[str(i)]['type'] = get_dict_key(self.MAP_TYPE_TYP, html.xpath(xp_type.format(nr=i))[0])
-        return config
-
-    def set_trap_config(self, new_config):
-        """
-        Form structure:
-        NMS1:<1->ip>
-        COM1:<1->community>
-        PER1:<1->severity>[valid values: non|inf|war|sev (none|info|warn|crit)]
-        TTT1:<1->version>[valid values: 0|1 (1|2)]
-        TYP1:<1->type>[valid values: v4|rfc (proprietary|rfc)]
-        NMS2:<2->ip>
-        ...
-        TYP8:<8->type>
-        Submit: Submit
-        """
-        config = self.get_snmp_config()
+        return self.TRAP_FORM.decode(self._get_form('/net_snmptrap.htm'))
+
+    def set_trap_config(self, new_config, dry_run=False):
+        current = self.get_trap_config()
+        config = dict(current)
         config.update(new_config)
-        data = {'Submit': 'Submit'}
-        for i in range(1, 9):
-            data['NMS%d' % i] = config[str(i)]['ip']
-            data['COM%d' % i] = config[str(i)]['community']
-            data['PER%d' % i] = self.MAP_SEV_PER.get((config[str(i)]['severity']), 'non')
-            data['TTT%d' % i] = self.MAP_VER_TTT.get(config[str(i)]['version'], '1')
-            data['TYP%d' % i] = self.MAP_TYPE_TYP.get(config[str(i)]['type'], 'rfc')
-        response = requests.post('http://%s/tgi/net_trapaccess.tgi' % self.host,
-                                 cookies=self.cookies,
-                                 data=data)
-        response.raise_for_status()
-        return True
+        return self._submit_form('trap', '/tgi/net_trapaccess.tgi',
+                                 self.TRAP_FORM.encode(current), self.TRAP_FORM.encode(config),
+                                 diff_config(current, new_config), dry_run)
 
+    @tracked
     def get_info(self):
         """
         forms/socomec/netys/info_ident.htm
@@ -194,6 +210,64 @@ class UpsSocomecNetys(UpsGeneric):
         info['rating_va'] = info['rating_va'].split(' ')[0]
         return info
 
+    def get_status(self):
+        """
+        forms/socomec/netys/info_io.htm
+        forms/socomec/netys/info_battery.htm
+        forms/socomec/netys/info_status.htm
+        """
+        values = self._get_table('/info_io.htm', cache=False)
+        values.update(self._get_table('/info_battery.htm', cache=False))
+        status = {}
+        for label, (key, conv) in self.STATUS_FIELDS.items():
+            value = values.get(label) or None
+            if conv == 'seconds':
+                seconds = get_number(value, int)
+                if seconds is not None and 'minute' in value.lower():
+                    seconds *= 60
+                value = seconds
+            elif conv is not None:
+                value = get_number(value, conv)
+            status[key] = value
+        status['alarms'] = []
+        status['states'] = []
+        html = self._get_html('/info_status.htm', cache=False)
+        for lamp in html.xpath('//td[img[starts-with(@src, "l_") or starts-with(@src, "/l_")]]'):
+            name = ' '.join(''.join(lamp.xpath('following-sibling::td[1]//text()')).split())
+            if not name or lamp.xpath('img/@src')[0].endswith('l_gray.gif'):
+                continue
+            if name in self.STATUS_STATES:
+                status['states'].append(name)
+            else:
+                status['alarms'].append(name)
+        return status
+
+    def iter_events(self, since=None):
+        return EventReader(self._event_pages(), since)
+
+    def _event_pages(self):
+        """
+        forms/socomec/netys/hist_log1.htm
+        """
+        page = 1
+        while True:
+            html = self._get_html('/hist_log%d.htm' % page, cache=False)
+            events = []
+            for row in html.xpath('//tr[count(td)=3]'):
+                cells = [' '.join(td.text_content().split()) for td in row.xpath('td')]
+                if not re.match(r'^\d\d/\d\d/\d{4}$', cells[0]):
+                    continue
+                time = '%s %s' % (cells[0], cells[1])
+                try:
+                    timestamp = datetime.strptime(time, '%m/%d/%Y %H:%M:%S')
+                except ValueError:
+                    timestamp = None
+                events.append({'time': time, 'timestamp': timestamp, 'event': cells[2]})
+            yield events
+            page += 1
+            if not events or not html.xpath('//a[@href="/hist_log%d.htm"]' % page):
+                return
+
     def reboot(self):
         """
         No reboot option in the web interface. Just logout.
@@ -201,171 +275,122 @@ class UpsSocomecNetys(UpsGeneric):
         return self.logout()
 
     def _get_info_html(self):
-        response = requests.get('http://%s/info_ident.htm' % self.host, cookies=self.cookies)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
-        return html
+        return self._get_html('/info_ident.htm')
 
 
 class UpsSocomecMasterys(UpsGeneric):
+    vendor = 'socomec'
     MAP_ACCESS = {
         'ro': '1',
         'rw': '2',
         'none': '3'
     }
+    # forms/socomec/masterys/PageAdmAgentAccess.html: entries 1-7 in rows B-H, default in row I
+    SNMP_FORM = FormSpec([
+        Rows(zip(map(str, range(1, 8)), char_range('B', 'H')), [
+            Field('ip', 'XAAAAAAA{row}AADE', default=''),
+            Field('community', 'XAAAAAAA{row}AADF'),
+            Field('access', 'XAAAAAAA{row}AADG', ValueMap(MAP_ACCESS, default='none', form_default='none')),
+        ]),
+        Rows([('default', 'I')], [
+            Field('community', 'XAAAAAAA{row}AADF'),
+            Field('access', 'XAAAAAAA{row}AADG', ValueMap(MAP_ACCESS, default='none', form_default='none')),
+        ], form_constants={'XAAAAAAA{row}AADE': ''}),
+    ])
+    # forms/socomec/masterys/PageAdmAgentTrap.html: entries 1-8 in rows B-I
+    TRAP_FORM = FormSpec([
+        Rows(zip(map(str, range(1, 9)), char_range('B', 'I')), [
+            Field('ip', 'XAAAAAAA{row}AAFE', default=''),
+            Field('community', 'XAAAAAAA{row}AAFF'),
+            Field(('severity', 'type'), 'XAAAAAAA{row}AAFJ',
+                  ValueMap({('none', 'rfc'): '1', ('info', 'proprietary'): '2', ('info', 'rfc'): '3'},
+                           default=('none', 'rfc'), decode_extra={'': ('info', 'proprietary'), None: ('info', 'proprietary')}),
+                  default='2', missing=('', 'rfc'), encode=_masterys_trap_type),
+            Field('alias', 'XAAAAAAA{row}AAFG', default='', missing=''),
+        ]),
+    ])
 
-    def __init__(self, *args, **kwargs):
-        self.auth = None
-        super(UpsSocomecMasterys, self).__init__(*args, **kwargs)
+    # skip checking credentials in login(), a wrong password fails the first real request
+    lazy_auth = False
+
+    def __init__(self, host, user, password, lazy_auth=None, **kwargs):
+        """
+        :param lazy_auth: override lazy_auth of the class
+        """
+        super(UpsSocomecMasterys, self).__init__(host, user, password, **kwargs)
+        if lazy_auth is not None:
+            self.lazy_auth = lazy_auth
 
     def login(self):
         # not an actual login, use http basic auth on every request
         self.auth = (self.user, self.password)
-        response = requests.get('http://%s/PageMonComprehensive.html' % self.host, auth=self.auth)
-        if not response.ok:
-            raise LoginFailure()
+        if not self.lazy_auth:
+            self.check_login()
+        return True
+
+    def check_login(self):
+        """
+        Checks credentials by reading the small identification page. It is
+        cached, so a following get_info() costs no request.
+
+        :raises LoginFailure: if device does not accept the credentials
+        """
+        try:
+            self._get_html('/PageMonIdentification.html')
+        except requests.HTTPError as e:
+            raise LoginFailure('%s: %s' % (self.host, e))
         return True
 
+    def _request(self, method, path, **kwargs):
+        response = super(UpsSocomecMasterys, self)._request(method, path, **kwargs)
+        if response.status_code == 401:
+            raise LoginFailure('%s: user or password not accepted' % self.host)
+        return response
+
     def logout(self):
         """
         Basic http auth, nothing to logout from.
         """
         self.auth = None
+        self.close()
         return True
 
+    @tracked
     def get_snmp_config(self):
         """
         forms/socomec/masterys/PageAdmAgentAccess.html
         """
-        response = requests.get('http://%s/PageAdmAgentAccess.html' % self.host, auth=self.auth)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
-        xp_ip = '//input[@name="XAAAAAAA{nr}AADE"]/@value'
-        xp_community = '//input[@name="XAAAAAAA{nr}AADF"]/@value'
-        xp_access = '//select[@name="XAAAAAAA{nr}AADG"]/option[@selected]/@value'
-        config = {}
-        idx = 1
-        for i in char_range('B', 'I'):
-            config[str(idx)] = {'ip': get_list_item(html.xpath(xp_ip.format(nr=i)), 0, '')}
-            config[str(idx)]['community'] = html.xpath(xp_community.format(nr=i))[0]
-            config[str(idx)]['access'] = get_dict_key(self.MAP_ACCESS, str(html.xpath(xp_access.format(nr=i))[0]), 'none')
-            idx += 1
-        # change the last entry into a default
-        last_idx = str(idx-1)
-        last_entry = config[last_idx]
-        del(last_entry['ip'])
-        config['default'] = last_entry
-        del(config[last_idx])
-        return config
-
-    def set_snmp_config(self, new_config):
-        """
-        Form structure:
-        XAAAAAAABAADE: <1->ip>
-        XAAAAAAABAADF: <1->community>
-        XAAAAAAABAADG: <1->access>[valid values: 1|2|3 (ro|rw|none)]
-        XAAAAAAACAADE: <2->ip>
-        XAAAAAAACAADF: <2->community>
-        XAAAAAAACAADG: <2->access>[valid values: 1|2|3 (ro|rw|none)]
-        ...
-        XAAAAAAAIAADE: ''
-        XAAAAAAAIAADF: <default->community>
-        XAAAAAAAIAADG: <default->access>[valid values: 1|2|3 (ro|rw|none)]
-        """
-        config = self.get_snmp_config()
+        return self.SNMP_FORM.decode(self._get_form('/PageAdmAgentAccess.html'))
+
+    def set_snmp_config(self, new_config, dry_run=False):
+        current = self.get_snmp_config()
+        config = dict(current)
         config.update(new_config)
-        data = {}
-        idx = 1
-        for i in char_range('B', 'H'):
-            entry = config[str(idx)]
-            data['XAAAAAAA%sAADE' % i] = entry['ip']
-            data['XAAAAAAA%sAADF' % i] = entry['community']
-            data['XAAAAAAA%sAADG' % i] = self.MAP_ACCESS.get(entry['access'], 'none')
-            idx += 1
-        data['XAAAAAAAIAADE'] = ''
-        data['XAAAAAAAIAADF'] = config['default']['community']
-        data['XAAAAAAAIAADG'] = self.MAP_ACCESS.get(config['default']['access'], 'none')
-        response = requests.post('http://%s/PageAdmAgentAccess.html' % self.host,
-                                 auth=self.auth,
-                                 data=data)
-        response.raise_for_status()
-        return True
+        return self._submit_form('snmp', '/PageAdmAgentAccess.html',
+                                 self.SNMP_FORM.encode(current), self.SNMP_FORM.encode(config),
+                                 diff_config(current, new_config), dry_run)
 
+    @tracked
     def get_trap_config(self):
         """
         forms/socomec/masterys/PageAdmAgentTrap.html
         """
-        response = requests.get('http://%s/PageAdmAgentTrap.html' % self.host, auth=self.auth)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
-        xp_ip = '//input[@name="XAAAAAAA{nr}AAFE"]/@value'
-        xp_community = '//input[@name="XAAAAAAA{nr}AAFF"]/@value'
-        xp_type = '//select[@name="XAAAAAAA{nr}AAFJ"]/option[@selected]/@value'
-        xp_alias = '//input[@name="XAAAAAAA{nr}AAFG"]/@value'
-        config = {}
-        idx = 1
-        for i in char_range('B', 'I'):
-            entry = {'ip': get_list_item(html.xpath(xp_ip.format(nr=i)), 0, '')}
-            entry['community'] = html.xpath(xp_community.format(nr=i))[0]
-            type_device = get_list_item(html.xpath(xp_type.format(nr=i)), 0, '2')
-            if type_device == '3':
-                entry['severity'] = 'info'
-                entry['type'] = 'rfc'
-            elif type_device == '2':
-                entry['severity'] = 'info'
-                entry['type'] = 'proprietary'
-            else:
-                entry['severity'] = 'none'
-                entry['type'] = 'rfc'
-            entry['alias'] = get_list_item(html.xpath(xp_alias.format(nr=i)), 0, '')
-            config[str(idx)] = entry
-            idx += 1
-        return config
-
-    def set_trap_config(self, new_config):
-        """
-        Form structure:
-        XAAAAAAABAAFE: <1->ip>
-        XAAAAAAABAAFF: <1->community>
-        XAAAAAAABAAFJ: <1->type|severity>[valid values: 1|2|3 (severity.none|type.proprietary|type.rfc)
-        XAAAAAAABAAFG: <1->alias>
-        XAAAAAAACAAFE: <2->ip>
-        XAAAAAAACAAFF: <2->community>
-        XAAAAAAACAAFJ: <2->type|severity>[valid values: 1|2|3 (severity.none|type.proprietary|type.rfc)
-        XAAAAAAACAAFG: <2->alias>
-        ...
-        XAAAAAAAIAAFG: <8->alias>
-        """
-        config = self.get_trap_config()
+        return self.TRAP_FORM.decode(self._get_form('/PageAdmAgentTrap.html'))
+
+    def set_trap_config(self, new_config, dry_run=False):
+        current = self.get_trap_config()
+        config = dict(current)
         config.update(new_config)
-        data = {}
-        idx = 1
-        for i in char_range('B', 'I'):
-            entry = config[str(idx)]
-            data['XAAAAAAA%sAAFE' % i] = entry['ip']
-            data['XAAAAAAA%sAAFF' % i] = entry['community']
-            if entry.get('severity', '') == 'none':
-                typ = '1'
-            elif entry.get('type', 'rfc') == 'proprietary':
-                typ = '2'
-            else:
-                typ = '3'
-            data['XAAAAAAA%sAAFJ' % i] = typ
-            data['XAAAAAAA%sAAFG' % i] = entry.get('alias', '')
-            idx += 1
-        response = requests.post('http://%s/PageAdmAgentTrap.html' % self.host,
-                                 auth=self.auth,
-                                 data=data)
-        response.raise_for_status()
-        return True
+        return self._submit_form('trap', '/PageAdmAgentTrap.html',
+                                 self.TRAP_FORM.encode(current), self.TRAP_FORM.encode(config),
+                                 diff_config(current, new_config), dry_run)
 
+    @tracked
     def get_info(self):
         """
         forms/socomec/modulys/PageMonIdentification.html
         """
-        response = requests.get('http://%s/PageMonIdentification.html' % self.host, auth=self.auth)
-        response.raise_for_status()
-        html = lxml.html.document_fromstring(response.text)
+        html = self._get_html('/PageMonIdentification.html')
         xpaths = {
             'model': '//td/*[text()="UPS Model"]/../following-sibling::td//td/*/text()',
             'serial': '//td/*[text()="UPS Serial Number"]/../following-sibling::td//td/*/text()',
@@ -387,8 +412,7 @@ class UpsSocomecMasterys(UpsGeneric):
 
     def reboot(self):
         data = {'XAAAAAAABAAAO': '1'}
-        requests.post('http://%s/PageAdmAgentControl.html' % self.host,
-                      auth=self.auth,
-                      data=data)
+        self._post('/PageAdmAgentControl.html', data)
         self.auth = None
+        self.close()
         return True
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Declarative mapping between config dicts (as returned by get_snmp_config()
+and get_trap_config()) and device form fields.
+
+A FormSpec lists Rows of config entries. Each row has a row id that is put
+into form field name templates, eg. entry '1' in row 'B' reads field
+`XAAAAAAABAADE` from template `XAAAAAAA{row}AADE`. Field names, reverse value
+maps and per-row tables are computed once, when the spec is created (as a
+driver class attribute), so decoding and encoding are plain table lookups:
+
+```
+TRAP_FORM = FormSpec([
+    Rows([(str(i), i) for i in range(1, 9)], [
+        Field('ip', 'NMS{row}'),
+        Field('community', 'COM{row}'),
+        Field('severity', 'PER{row}', ValueMap({'none': 'non', 'info': 'inf'}, form_default='non')),
+    ]),
+], form_constants={'Submit': 'Submit'})
+
+config = TRAP_FORM.decode(form)
+data = TRAP_FORM.encode(config)
+```
+"""
+
+_text = type(u'')
+
+# marks a form field or config key that must be present
+REQUIRED = object()
+
+
+def _same(value):
+    return value
+
+
+def _form_value(value):
+    """
+    :return: config value as a string (version 2 is written like '2', see upsconfer.diff.diff_config()), None as it is
+    """
+    if value is None or isinstance(value, (_text, bytes)):
+        return value
+    return '%s' % value
+
+
+class ValueMap(object):
+    """
+    Bidirectional map between config values and form values.
+    """
+
+    def __init__(self, mapping, default=None, form_default=None, decode_extra=None):
+        """
+        :param mapping: dict of config value -> form value, form values must be unique
+        :param default: config value for form values that are not in mapping
+        :param form_default: form value for config values that are not in mapping
+        :param decode_extra: more form value -> config value pairs, for form values that are never written
+        """
+        self.to_form = dict(mapping)
+        self.from_form = dict((v, k) for k, v in self.to_form.items())
+        if len(self.from_form) != len(self.to_form):
+            raise ValueError('Form values of %r are not unique' % (mapping,))
+        self.from_form.update(decode_extra or {})
+        self.default = default
+        self.form_default = form_default
+
+    def decode(self, value):
+        return self.from_form.get(value, self.default)
+
+    def encode(self, value):
+        return self.to_form.get(value, self.form_default)
+
+
+class Field(object):
+    def __init__(self, key, name, values=None, default=REQUIRED, missing=REQUIRED, strip=False,
+                 decode=None, encode=None, write=True):
+        """
+        :param key: config key, or a tuple of keys for a form field that holds several values
+        :param name: form field name, {row} is replaced with the row id of the entry
+        :param values: ValueMap, values are copied as they are without one
+        :param default: form value used when the field is not in the form, by default the field must be present
+        :param missing: config value used when building the form for an entry without key, by default key must be present
+        :param strip: strip whitespace around form values
+        :param decode: function form value -> config value, instead of values
+        :param encode: function config value -> form value, instead of values
+        :param write: False for fields that are read, but never written to the form
+        """
+        self.key = key
+        self.name = name
+        self.values = values
+        self.default = default
+        self.missing = missing
+        self.strip = strip
+        self.write = write
+        self.custom_decode = decode is not None
+        self.custom_encode = encode is not None
+        self.decode = decode or (values.decode if values is not None else _same)
+        self.encode = encode or (values.encode if values is not None else _same)
+
+    def read(self, form, name, entry):
+        """
+        Decodes form field name into entry.
+        """
+        if self.default is REQUIRED:
+            value = form[name]
+        else:
+            value = form.get(name, self.default)
+        if self.strip:
+            value = value.strip()
+        value = self.decode(value)
+        if isinstance(self.key, tuple):
+            entry.update(zip(self.key, value))
+        else:
+            entry[self.key] = value
+
+    def value(self, entry):
+        """
+        :return: form value for config entry
+        """
+        if isinstance(self.key, tuple):
+            missing = self.missing if self.missing is not REQUIRED else (REQUIRED,) * len(self.key)
+            value = tuple(_form_value(entry[k] if m is REQUIRED else entry.get(k, m))
+                          for k, m in zip(self.key, missing))
+        elif self.missing is REQUIRED:
+            value = _form_value(entry[self.key])
+        else:
+            value = _form_value(entry.get(self.key, self.missing))
+        return self.encode(value)
+
+    def reader(self, name):
+        """
+        :param name: form field name of an entry
+        :return: function(form, entry) that decodes the field into entry. Fields with a single key
+                 and without a decode function only look values up in dicts.
+        """
+        if isinstance(self.key, tuple) or self.custom_decode:
+            return lambda form, entry: self.read(form, name, entry)
+        key, default, strip = self.key, self.default, self.strip
+        mapping = self.values.from_form if self.values is not None else None
+        map_default = self.values.default if self.values is not None else None
+
+        def read(form, entry):
+            value = form[name] if default is REQUIRED else form.get(name, default)
+            if strip:
+                value = value.strip()
+            entry[key] = value if mapping is None else mapping.get(value, map_default)
+        return read
+
+    def writer(self, name):
+        """
+        :param name: form field name of an entry
+        :return: function(entry, data) that puts the form value for entry into form data dict. Config
+                 values are written and looked up as strings.
+        """
+        if isinstance(self.key, tuple) or self.custom_encode or self.missing is not REQUIRED:
+            def write(entry, data):
+                data[name] = self.value(entry)
+            return write
+        key = self.key
+        if self.values is None:
+            def write(entry, data):
+                value = entry[key]
+                data[name] = value if type(value) is str else _form_value(value)
+            return write
+        mapping, form_default = self.values.to_form, self.values.form_default
+
+        def write(entry, data):
+            # form values are never None, a miss is looked up again as a string
+            value = mapping.get(entry[key])
+            data[name] = value if value is not None else mapping.get(_form_value(entry[key]), form_default)
+        return write
+
+
+class Rows(object):
+    def __init__(self, rows, fields, constants=None, form_constants=None, partial=False):
+        """
+        :param rows: list of (entry, row id) pairs
+        :param fields: list of Field read and written for every entry
+        :param constants: config values every decoded entry gets, eg. {'access': 'ro'}
+        :param form_constants: dict of field name template -> value written for every entry
+        :param partial: when encoding, skip entries that are not in config instead of failing
+        """
+        self.rows = list(rows)
+        self.fields = list(fields)
+        self.constants = dict(constants or {})
+        self.form_constants = dict(form_constants or {})
+        self.partial = partial
+
+
+class FormSpec(object):
+    def __init__(self, rows, form_constants=None):
+        """
+        :param rows: list of Rows
+        :param form_constants: dict of form field -> value written once for the whole form
+        """
+        self.form_constants = dict(form_constants or {})
+        # (entry, constants, readers, form constants, writers, partial) per entry,
+        # see Field.reader() and Field.writer()
+        self.table = []
+        for block in rows:
+            for entry, row in block.rows:
+                fields = [(f.name.format(row=row), f) for f in block.fields]
+                constants = dict((name.format(row=row), value) for name, value in block.form_constants.items())
+                readers = [f.reader(name) for name, f in fields]
+                writers = [f.writer(name) for name, f in fields if f.write]
+                self.table.append((entry, block.constants, readers, constants, writers, block.partial))
+
+    def decode(self, form):
+        """
+        :param form: dict of form field values (see upsconfer.form.FormExtractor)
+        :return: config dict
+        """
+        config = {}
+        for entry, constants, readers, form_constants, writers, partial in self.table:
+            values = dict(constants)
+            for read in readers:
+                read(form, values)
+            config[entry] = values
+        return config
+
+    def encode(self, config):
+        """
+        :return: dict of form field -> value for config
+        """
+        data = dict(self.form_constants)
+        for entry, constants, readers, form_constants, writers, partial in self.table:
+            if partial and entry not in config:
+                continue
+            values = config[entry]
+            data.update(form_constants)
+            for write in writers:
+                write(values, data)
+        return data
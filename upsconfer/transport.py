@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+########################################################################
+#
+# (C) 2017, Matej Vadnjal, Arnes <matej@arnes.si> <matej@vadnjal.net>
+#
+# This file is part of upsconfer
+#
+# upsconfer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# upsconfer is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with upsconfer.  If not, see <http://www.gnu.org/licenses/>.
+#
+########################################################################
+
+"""
+Transports for recording HTTP exchanges with devices and replaying them
+without a network.
+
+All HTTP access of drivers goes through a requests transport adapter passed
+as `adapter` to the driver (see UpsGeneric):
+
+* live: requests' HTTPAdapter, the default (or a shared_pool())
+* RecordingAdapter: live, and every exchange is appended to a file
+* ReplayAdapter: responses are served from such files, no network is used
+
+```
+recorder = RecordingAdapter('netys.jsonl')
+ups = UpsSocomecNetys('myups.example.com', 'admin', 'mypass', adapter=recorder)
+...
+replay = ReplayAdapter('netys.jsonl')
+for result in fleet.run([(UpsSocomecNetys, 'sim%d' % i, 'admin', 'x') for i in range(1000)],
+                        'get_info', adapter=replay):
+    ...
+```
+"""
+
+import base64
+import io
+import json
+import threading
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.cookies import extract_cookies_to_jar
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# content is stored decoded, these would not match it any more
+SKIP_HEADERS = ['content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive']
+NOT_RECORDED = {'status': 404, 'reason': 'Not Recorded', 'headers': [], 'content': b''}
+
+
+class _OriginalResponse(object):
+    """
+    Enough of httplib.HTTPResponse for requests to read cookies from.
+    """
+
+    def __init__(self, headers):
+        self.msg = self
+        self._headers = headers
+
+    def get_all(self, name, default=None):
+        values = [v for k, v in self._headers if k.lower() == name.lower()]
+        return values or (default if default is not None else [])
+
+    # python 2 cookielib
+    getheaders = get_all
+
+    def info(self):
+        return self
+
+
+class _Raw(object):
+    def __init__(self, headers):
+        self._original_response = _OriginalResponse(headers)
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+def _header_items(response):
+    """
+    :return: list of (name, value) response headers, repeated headers (eg. Set-Cookie) kept apart
+    """
+    headers = getattr(response.raw, 'headers', None)
+    if headers is None:
+        return list(response.headers.items())
+    items = getattr(headers, 'iteritems', headers.items)
+    return list(items())
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Live transport that appends every request and response to a JSON lines
+    file, one exchange per line.
+
+    Request bodies and headers are not recorded, so passwords do not end up
+    in recordings. Session cookies set by devices do.
+    """
+
+    def __init__(self, path, **kwargs):
+        """
+        :param path: file to append exchanges to
+        :param kwargs: passed to HTTPAdapter, eg. pool_connections
+        """
+        super(RecordingAdapter, self).__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        response = super(RecordingAdapter, self).send(request, **kwargs)
+        entry = {
+            'host': request.url.split('/')[2],
+            'method': request.method,
+            'path': request.path_url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': [[k, v] for k, v in _header_items(response) if k.lower() not in SKIP_HEADERS],
+            'content': base64.b64encode(response.content).decode('ascii'),
+        }
+        line = json.dumps(entry, sort_keys=True)
+        with self._lock:
+            with io.open(self.path, 'a', encoding='utf-8') as f:
+                f.write(u'%s\n' % line)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Serves responses from recordings made with RecordingAdapter.
+
+    Requests are matched by method and path (with query string). When the
+    same request was recorded several times, responses are served in the
+    recorded order and the last one is repeated after that. By default the
+    host is ignored, so one recorded device can stand in for any number of
+    simulated ones; each simulated host keeps its own place in the sequence.
+
+    Requests with no recording get a `404 Not Recorded` response, like a
+    device answers for pages it does not have. The adapter is thread safe
+    and meant to be shared by all devices.
+    """
+    # no proxies or netrc needed, see UpsGeneric.session
+    trust_env = False
+
+    def __init__(self, *paths, **kwargs):
+        """
+        :param paths: recording files
+        :param match_host: only serve responses recorded for the same host
+        """
+        super(ReplayAdapter, self).__init__()
+        self.match_host = kwargs.pop('match_host', False)
+        if kwargs:
+            raise TypeError('Unexpected arguments %s' % ', '.join(kwargs))
+        self._recordings = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        for path in paths:
+            self.load(path)
+
+    def _key(self, host, method, path):
+        return (host if self.match_host else None, method.upper(), path)
+
+    def load(self, path):
+        with io.open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                entry['content'] = base64.b64decode(entry['content'])
+                key = self._key(entry['host'], entry['method'], entry['path'])
+                self._recordings.setdefault(key, []).append(entry)
+
+    def send(self, request, **kwargs):
+        host = request.url.split('/')[2]
+        key = self._key(host, request.method, request.path_url)
+        entries = self._recordings.get(key)
+        if not entries:
+            return self.build_response(request, NOT_RECORDED)
+        with self._lock:
+            served = self._served.get((host,) + key, 0)
+            self._served[(host,) + key] = served + 1
+        entry = entries[min(served, len(entries) - 1)]
+        return self.build_response(request, entry)
+
+    def build_response(self, request, entry):
+        response = Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict()
+        for name, value in entry['headers']:
+            if name in response.headers:
+                response.headers[name] = '%s, %s' % (response.headers[name], value)
+            else:
+                response.headers[name] = value
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry['content']
+        response._content_consumed = True
+        response.raw = _Raw([tuple(h) for h in entry['headers']])
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        extract_cookies_to_jar(response.cookies, request, response.raw)
+        return response
+
+    def close(self):
+        pass
@@ -20,12 +20,18 @@
 #
 ########################################################################
 
+import errno
+import json
+import os
+import re
+import tempfile
+
 
 def char_range(c1, c2):
     """Generates the characters from `c1` to `c2`, inclusive.
        http://stackoverflow.com/a/7001371
     """
-    for c in xrange(ord(c1), ord(c2)+1):
+    for c in range(ord(c1), ord(c2)+1):
         yield chr(c)
 
 
@@ -35,7 +41,32 @@ def get_list_item(l, idx=0, default=None):
     return l[idx]
 
 
-def get_dict_key(d, value, default=None):
-    if value not in d.values():
+def get_number(s, cast=float, default=None):
+    """Returns the first number in string `s` (eg. `229.0 V`) converted with `cast`."""
+    m = re.search(r'-?\d+(?:\.\d+)?', s or '')
+    if not m:
         return default
-    return d.keys()[d.values().index(value)]
+    return cast(float(m.group(0)))
+
+
+def makedirs(directory, mode=0o777):
+    """Creates `directory` and its parents, unless it exists."""
+    try:
+        os.makedirs(directory, mode)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def write_json(path, data):
+    """Replaces file `path` with `data` as JSON atomically: written to a temporary
+       file in the same directory first, then renamed over it.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        getattr(os, 'replace', os.rename)(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise